@@ -0,0 +1,167 @@
+#在version3的基础上按时间分片并行计算
+#每一时刻的位置只依赖于龙头在该时刻的位置，所以时间轴可以切成若干段交给多个进程
+#各进程直接写入共享内存中的positions/velocities，不做任何拷贝
+import numpy as np
+import matplotlib.pyplot as plt
+import os
+import time
+import pandas as pd
+from multiprocessing import Pool, shared_memory
+from matplotlib import rcParams
+
+# 设置字体，确保能够显示中文字符
+rcParams['font.sans-serif'] = ['SimHei']  # 使用黑体
+rcParams['axes.unicode_minus'] = False  # 解决负号'-'显示为方块的问题
+
+# 定义常量
+p = 0.55  # 螺距(m)
+v_head = 1.0  # 龙头速度(m/s)
+t_total = 300  # 总时间(s)
+dt = 1.0  # 时间步长(s)，可以设置得更小，例如0.01
+r_0 = 16 * p  # 螺线起始半径，假设起始在第16圈
+num_sections = 223  # 总板凳节数
+length_head = 3.41  # 龙头长度(m)
+length_body = 2.20  # 龙身和龙尾长度(m)
+section_lengths = [length_head] + [length_body] * (num_sections - 1)  # 各节板凳长度
+
+num_steps = int(round(t_total / dt)) + 1  # 时间步数(包括t=0)
+num_workers = os.cpu_count() or 1  # 并行进程数
+chunks_per_worker = 4  # 每个进程分到的时间段数，多切几段可以让负载更均衡
+
+# 子进程中挂接的共享内存，由init_worker设置
+_shm_positions = None
+_shm_velocities = None
+positions = None
+velocities = None
+
+# 计算一段时刻上所有板凳的位置，times为一维数组，返回(len(times), num_sections, 2)
+def calculate_block_positions(times, out):
+    # 半径随时间变化
+    r = r_0 + p * times / (2 * np.pi)
+    theta = times / r  # 极角随时间变化
+    x = r * np.cos(theta)
+    y = r * np.sin(theta)
+    out[:, 0, 0] = x
+    out[:, 0, 1] = y
+    # 与version3相同：第i节沿前一节把手与原点连线的反方向偏移section_lengths[i]
+    for i in range(1, num_sections):
+        direction = np.arctan2(y, x) + np.pi
+        x = x + section_lengths[i] * np.cos(direction)
+        y = y + section_lengths[i] * np.sin(direction)
+        out[:, i, 0] = x
+        out[:, i, 1] = y
+    return out
+
+# 子进程初始化：挂接共享内存，把positions/velocities指向共享缓冲区
+def init_worker(positions_name, velocities_name):
+    global _shm_positions, _shm_velocities, positions, velocities
+    _shm_positions = shared_memory.SharedMemory(name=positions_name)
+    _shm_velocities = shared_memory.SharedMemory(name=velocities_name)
+    positions = np.ndarray((num_steps, num_sections, 2), dtype=np.float64, buffer=_shm_positions.buf)
+    velocities = np.ndarray((num_steps, num_sections), dtype=np.float64, buffer=_shm_velocities.buf)
+
+# 计算时间步[start, stop)上的位置和速度，直接写入共享内存
+def solve_block(bounds):
+    start, stop = bounds
+    calculate_block_positions(np.arange(start, stop) * dt, positions[start:stop])
+    # 速度需要前一时刻的位置，块首的前一时刻由本进程自己重算一次，避免进程间等待
+    if start == 0:
+        velocities[0] = 0  # 初始时刻速度为0
+        first = 1
+    else:
+        first = start
+    if first >= stop:
+        return stop - start
+    halo = calculate_block_positions(np.array([(first - 1) * dt]), np.empty((1, num_sections, 2)))
+    prev = np.concatenate((halo, positions[first:stop - 1]))
+    diff = positions[first:stop] - prev
+    velocities[first:stop] = np.sqrt(diff[..., 0] ** 2 + diff[..., 1] ** 2) / dt
+    return stop - start
+
+# 把时间轴切成若干段
+def split_time_axis(n_steps, n_chunks):
+    edges = np.linspace(0, n_steps, min(n_chunks, n_steps) + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+# 并行计算全部时刻，返回结果以及共享内存句柄(调用者负责释放)
+def simulate_parallel():
+    shm_positions = shared_memory.SharedMemory(create=True, size=num_steps * num_sections * 2 * 8)
+    shm_velocities = shared_memory.SharedMemory(create=True, size=num_steps * num_sections * 8)
+    chunks = split_time_axis(num_steps, num_workers * chunks_per_worker)
+    try:
+        with Pool(num_workers, initializer=init_worker,
+                  initargs=(shm_positions.name, shm_velocities.name)) as pool:
+            pool.map(solve_block, chunks)
+    except BaseException:
+        # 计算失败时也要删除共享内存，否则会一直留在/dev/shm中
+        release_shared_memory((shm_positions, shm_velocities))
+        raise
+    result_positions = np.ndarray((num_steps, num_sections, 2), dtype=np.float64, buffer=shm_positions.buf)
+    result_velocities = np.ndarray((num_steps, num_sections), dtype=np.float64, buffer=shm_velocities.buf)
+    return result_positions, result_velocities, (shm_positions, shm_velocities)
+
+# 释放共享内存
+def release_shared_memory(handles):
+    for shm in handles:
+        shm.close()
+        shm.unlink()
+
+# 整秒时刻所在的行和对应的秒数(dt不能整除1秒时只取恰好落在整秒上的时刻)
+def second_rows():
+    times = np.arange(num_steps) * dt
+    rows = np.flatnonzero(np.isclose(times, np.round(times)))
+    return rows, np.round(times[rows]).astype(int)
+
+# 可视化螺线和板凳位置
+def plot_positions(positions):
+    fig, ax = plt.subplots(figsize=(10, 10))
+    ax.set_aspect('equal')
+
+    rows, seconds = second_rows()
+    for t in [0, 60, 120, 180, 240, 300]:
+        row = rows[seconds == t]
+        if len(row):
+            ax.plot(positions[row[0], :, 0], positions[row[0], :, 1], label=f't={t}s')
+
+    # 可视化龙头位置
+    ax.scatter(positions[rows, 0, 0], positions[rows, 0, 1], color='red', s=50, label='龙头轨迹')
+    # 设置图表标题和坐标轴标签
+    ax.set_title('舞龙队沿螺线运动轨迹')
+    ax.set_xlabel('x位置(m)')
+    ax.set_ylabel('y位置(m)')
+
+    # 显示图例并添加网格
+    ax.legend()
+    plt.grid(True)
+
+    # 显示图表
+    plt.show()
+
+# 保存整秒时刻的结果到 Excel 文件
+def save_result(positions, velocities, excel_file_path='result1.xlsx'):
+    rows, seconds = second_rows()
+    result = pd.DataFrame({
+        "time": np.repeat(seconds, num_sections),
+        "section": np.tile(np.arange(1, num_sections + 1), len(rows)),
+        "x_position": positions[rows, :, 0].ravel(),
+        "y_position": positions[rows, :, 1].ravel(),
+        "velocity": velocities[rows].ravel(),
+    })
+    try:
+        result.to_excel(excel_file_path, index=False)
+        print(f"文件已保存到: {excel_file_path}")
+    except Exception as e:
+        print(f"文件保存失败: {e}")
+
+
+if __name__ == '__main__':
+    start_time = time.perf_counter()
+    positions, velocities, handles = simulate_parallel()
+    print(f"{num_workers}个进程计算{num_steps}个时刻用时: {time.perf_counter() - start_time:.3f}秒")
+    try:
+        plot_positions(positions)
+        save_result(positions, velocities)
+    finally:
+        # 释放前去掉对共享缓冲区的引用
+        del positions, velocities
+        release_shared_memory(handles)
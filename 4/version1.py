@@ -17,54 +17,57 @@ length_body = 2.20  # 龙身和龙尾长度(m)
 section_lengths = [length_head] + [length_body] * (num_sections - 1)  # 各节板凳长度
 time_steps = 200  # 调头的时间步数
 
-# 计算第一段圆弧的路径
-def calculate_first_arc(t, R1, v_head, start_angle):
-    theta = v_head * t / R1 + start_angle  # 角度随时间变化
-    x = R1 * np.cos(theta)
-    y = R1 * np.sin(theta)
-    return x, y, theta
-
-# 计算第二段圆弧的路径
-def calculate_second_arc(t, R2, start_angle):
-    theta = t / R2 + start_angle  # 角度随时间变化
-    x = R2 * np.cos(theta)
-    y = R2 * np.sin(theta)
-    return x, y
-
-# 计算每节板凳在调头路径上的位置
-def calculate_section_position(t, section_index, path_x, path_y, angles):
-    prev_x = path_x[section_index - 1]
-    prev_y = path_y[section_index - 1]
-    section_length = section_lengths[section_index]
-    direction = angles[section_index - 1] + np.pi  # 板凳方向
-    x = prev_x + section_length * np.cos(direction)
-    y = prev_y + section_length * np.sin(direction)
-    return x, y
-
-# 模拟调头路径
-def simulate_turn_path(time_steps, R1, R2):
-    path_x = np.zeros((time_steps, num_sections))
-    path_y = np.zeros((time_steps, num_sections))
-    angles = np.zeros((time_steps, num_sections))  # 用于计算方向
-
-    # 第一段圆弧
-    for t in range(time_steps // 2):
-        path_x[t, 0], path_y[t, 0], angles[t, 0] = calculate_first_arc(t, R1, v_head, 0)  # 龙头
-
-        # 计算每节板凳的位置
-        for i in range(1, num_sections):
-            path_x[t, i], path_y[t, i] = calculate_section_position(t, i, path_x[t], path_y[t], angles[t])
-
-    # 第二段圆弧
-    start_angle = angles[time_steps // 2 - 1, 0]  # 第二段圆弧的起始角度
-    for t in range(time_steps // 2, time_steps):
-        path_x[t, 0], path_y[t, 0] = calculate_second_arc(t - time_steps // 2, R2, start_angle)  # 龙头
-    
-        # 计算每节板凳的位置
-        for i in range(1, num_sections):
-            path_x[t, i], path_y[t, i] = calculate_section_position(t, i, path_x[t], path_y[t], angles[t - 1])
-
-    return path_x, path_y
+# 一次模拟用到的全部数组，按(节数, 时间步数)预先分配，多次模拟时重复使用，循环中不再申请新数组
+# 位置和极角按(节数, 时刻)存放，同一节板凳各时刻的数据连续，按节递推时每次处理一整行
+class ChainWorkspace:
+    __slots__ = ('num_sections', 'time_steps', 'times', 'path_x', 'path_y', 'angles', 'direction', 'scratch')
+
+    def __init__(self, num_sections, time_steps):
+        self.num_sections = num_sections
+        self.time_steps = time_steps
+        self.times = np.arange(time_steps, dtype=np.float64)
+        self.path_x = np.empty((num_sections, time_steps))
+        self.path_y = np.empty((num_sections, time_steps))
+        self.angles = np.empty((num_sections, time_steps))
+        self.direction = np.empty(time_steps)
+        self.scratch = np.empty(time_steps)
+
+# 模拟调头路径，所有时刻一起计算，结果写入workspace中的数组；返回(时刻, 节数)的视图
+# 与逐时刻计算相同：第一段圆弧上板凳方向取同一时刻的angles，第二段圆弧上取前一时刻的angles
+def simulate_turn_path(time_steps, R1, R2, workspace=None):
+    if workspace is None:
+        workspace = ChainWorkspace(num_sections, time_steps)
+    ws = workspace
+    path_x, path_y, angles, direction = ws.path_x, ws.path_y, ws.angles, ws.direction
+    half = time_steps // 2
+    angles.fill(0)
+
+    # 第一段圆弧：极角为v_head*t/R1
+    np.multiply(ws.times[:half], v_head / R1, out=angles[0, :half])
+    # 第二段圆弧：极角为t/R2，从第一段圆弧最后的角度开始
+    np.divide(ws.times[:time_steps - half], R2, out=direction[half:])
+    direction[half:] += angles[0, half - 1]
+    direction[:half] = angles[0, :half]
+    np.cos(direction, out=path_x[0])
+    path_x[0, :half] *= R1
+    path_x[0, half:] *= R2
+    np.sin(direction, out=path_y[0])
+    path_y[0, :half] *= R1
+    path_y[0, half:] *= R2
+
+    # 计算每节板凳的位置：沿前一节的极角方向的反方向偏移该节板凳长度
+    for i in range(1, num_sections):
+        direction[:half] = angles[i - 1, :half]
+        direction[half:] = angles[i - 1, half - 1:time_steps - 1]
+        direction += np.pi  # 板凳方向
+        np.cos(direction, out=ws.scratch)
+        ws.scratch *= section_lengths[i]
+        np.add(path_x[i - 1], ws.scratch, out=path_x[i])
+        np.sin(direction, out=ws.scratch)
+        ws.scratch *= section_lengths[i]
+        np.add(path_y[i - 1], ws.scratch, out=path_y[i])
+
+    return path_x.T, path_y.T
 
 # 可视化调头路径
 def plot_turn_path(path_x, path_y):
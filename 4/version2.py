@@ -0,0 +1,351 @@
+#在version1的基础上重写：一次计算-100s到100s的完整调头过程(盘入、S形调头、盘出)
+#路径用分段参数u表示：u<0为盘入螺线，0<=u<=调头路径长度为两段圆弧(u为弧长)，之后为盘出螺线(螺线上u与极角增量成正比)
+#每个把手都严格放在路径上，与前一个把手的距离等于板凳长度；所有时刻一起求解，速度由同一次计算解析得到
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+import pandas as pd
+from matplotlib import rcParams
+
+# 设置字体，确保能够显示中文字符
+rcParams['font.sans-serif'] = ['SimHei']  # 使用黑体
+rcParams['axes.unicode_minus'] = False  # 解决负号'-'显示为方块的问题
+
+# 定义常量
+v_head = 1.0  # 龙头行进速度(m/s)
+p = 1.7  # 盘入、盘出螺线的螺距(m)
+r_turn_space = 4.5  # 调头空间半径(9m直径)
+num_sections = 223  # 总板凳节数
+num_handles = num_sections + 1  # 把手数：每节板凳前后各一个，相邻板凳共用把手
+length_head = 3.41  # 龙头长度(m)
+length_body = 2.20  # 龙身和龙尾长度(m)
+hole_offset = 0.275  # 把手孔中心到板凳端头的距离(m)
+width = 0.30  # 板凳的宽度(m)
+section_lengths = [length_head] + [length_body] * (num_sections - 1)  # 各节板凳长度
+# 相邻把手之间的距离(板凳长度减去两端孔距)。若直接用板凳长度，龙头板凳(3.41m)比第二段圆弧的直径还长，
+# 龙头刚进入盘出螺线时把手在路径上的位置会跳到另一个解
+handle_spacings = [length - 2 * hole_offset for length in section_lengths]
+t_start = -100  # 起始时刻(s)，0时刻龙头到达调头空间边界
+t_end = 100  # 结束时刻(s)
+dt = 1.0  # 时间步长(s)
+newton_tolerance = 1e-12  # 求把手位置时的收敛精度
+table_step = 0.02  # 盘入螺线跟随表的极角间距(rad)
+
+# 计算调头路径的几何参数：两段圆弧与盘入、盘出螺线相切且彼此相切，前一段半径是后一段的2倍
+def build_turn_geometry(p=p, r_turn=r_turn_space):
+    b = p / (2 * np.pi)  # 螺线 r = b*theta
+    theta_in = r_turn / b  # 盘入螺线与调头空间边界的交点极角
+    a = b * theta_in * np.array([np.cos(theta_in), np.sin(theta_in)])  # 调头起点A，终点B=-A
+    # 盘入时极角减小，运动方向为 -dP/dtheta
+    tangent = -b * np.array([np.cos(theta_in) - theta_in * np.sin(theta_in),
+                             np.sin(theta_in) + theta_in * np.cos(theta_in)])
+    tangent /= np.linalg.norm(tangent)
+    normal = np.array([-tangent[1], tangent[0]])
+    if np.dot(a, normal) > 0:
+        normal = -normal  # 第一段圆弧向内侧弯
+    r2 = -r_turn ** 2 / (3 * np.dot(a, normal))  # 由|C1-C2|=R1+R2解出
+    r1 = 2 * r2
+    c1 = a + r1 * normal
+    c2 = -a - r2 * normal
+    touch = c1 + r1 / (r1 + r2) * (c2 - c1)  # 两段圆弧的切点
+    sigma1 = np.sign((a - c1)[0] * tangent[1] - (a - c1)[1] * tangent[0])  # 第一段圆弧的转向，1为逆时针
+    sigma2 = -sigma1
+    psi_a = np.arctan2(a[1] - c1[1], a[0] - c1[0])
+    psi_t1 = np.arctan2(touch[1] - c1[1], touch[0] - c1[0])
+    psi_t2 = np.arctan2(touch[1] - c2[1], touch[0] - c2[0])
+    psi_b = np.arctan2(-a[1] - c2[1], -a[0] - c2[0])
+    alpha1 = (sigma1 * (psi_t1 - psi_a)) % (2 * np.pi)  # 第一段圆弧转过的角度
+    alpha2 = (sigma2 * (psi_b - psi_t2)) % (2 * np.pi)
+    arc1 = r1 * alpha1
+    turn_length = arc1 + r2 * alpha2
+    # 螺线部分的参数按调头边界处的弧长缩放，使|dP/du|在各段衔接处连续(都为1)，牛顿迭代跨段时也能收敛
+    kappa = 1 / (b * np.sqrt(1 + theta_in ** 2))
+    # 四段路径统一写成 P = C + rho*(cos psi, sin psi)，psi = psi0 + k*(u - u0)，rho = rho0 + rho1*psi
+    # 依次为：盘入螺线、第一段圆弧、第二段圆弧、盘出螺线(盘出螺线是盘入螺线关于原点的中心对称，rho取负)
+    return {
+        "b": b, "theta_in": theta_in, "r1": r1, "r2": r2,
+        "arc1": arc1, "turn_length": turn_length,
+        "cx": np.array([0.0, c1[0], c2[0], 0.0]),
+        "cy": np.array([0.0, c1[1], c2[1], 0.0]),
+        "u0": np.array([0.0, 0.0, arc1, turn_length]),
+        "psi0": np.array([theta_in, psi_a, psi_t2, theta_in]),
+        "k": np.array([-kappa, sigma1 / r1, sigma2 / r2, kappa]),
+        "rho0": np.array([0.0, r1, r2, 0.0]),
+        "rho1": np.array([b, 0.0, 0.0, -b]),
+    }
+
+# 计算路径参数u处的位置和对u的导数，u为任意形状数组
+def path_point(u, geometry):
+    g = geometry
+    segment = (u >= 0).astype(np.intp) + (u >= g["arc1"]) + (u > g["turn_length"])
+    k = g["k"][segment]
+    rho1 = g["rho1"][segment]
+    psi = g["psi0"][segment] + k * (u - g["u0"][segment])
+    rho = g["rho0"][segment] + rho1 * psi
+    cos_psi, sin_psi = np.cos(psi), np.sin(psi)
+    # 导数 = rho'*e_psi + rho*psi'*e_psi⊥
+    d_rho = rho1 * k
+    d_tan = rho * k
+    x = g["cx"][segment] + rho * cos_psi
+    y = g["cy"][segment] + rho * sin_psi
+    dx = d_rho * cos_psi - d_tan * sin_psi
+    dy = d_rho * sin_psi + d_tan * cos_psi
+    return x, y, dx, dy
+
+# 螺线从极角0到theta的弧长
+def spiral_arc_length(theta, b):
+    return b / 2 * (theta * np.sqrt(1 + theta ** 2) + np.arcsinh(theta))
+
+# 由螺线上从调头空间边界量起的弧长反求极角增量(牛顿迭代)
+def spiral_angle_from_distance(distance, geometry):
+    b, theta_in = geometry["b"], geometry["theta_in"]
+    target = spiral_arc_length(theta_in, b) + distance
+    theta = np.sqrt(theta_in ** 2 + 2 * distance / b)  # 初值
+    for _ in range(50):
+        step = (spiral_arc_length(theta, b) - target) / (b * np.sqrt(1 + theta ** 2))
+        theta -= step
+        if np.max(np.abs(step), initial=0) < newton_tolerance:
+            break
+    return theta - theta_in
+
+# 计算龙头在各时刻的路径参数
+def head_path_parameter(times, geometry):
+    s = v_head * np.asarray(times, dtype=np.float64)  # 龙头从调头起点量起的路程
+    turn_length = geometry["turn_length"]
+    u = s.copy()
+    before = s < 0
+    after = s > turn_length
+    kappa = geometry["k"][3]
+    u[before] = -spiral_angle_from_distance(-s[before], geometry) / kappa
+    u[after] = turn_length + spiral_angle_from_distance(s[after] - turn_length, geometry) / kappa
+    return u
+
+# 已知前一个把手的路径参数，求后一个把手(在路径上更靠后、距离为length)的路径参数
+def solve_follower(u_prev, x_prev, y_prev, speed_prev, length, geometry):
+    # 距离平方减去板凳长度平方
+    def gap(u, xp=x_prev, yp=y_prev):
+        x, y, dx, dy = path_point(u, geometry)
+        return (xp - x) ** 2 + (yp - y) ** 2 - length ** 2, x, y, dx, dy
+
+    # 先往后退一个板凳长度的路程(弦长不超过弧长，这里距离还不够)，再按四分之一板凳长度的步子找到包含根的区间[lo, hi]
+    hi = u_prev.copy()
+    u = u_prev - length / speed_prev
+    g, x, y, dx, dy = gap(u)
+    for _ in range(200):
+        short = g < 0
+        if not short.any():
+            break
+        hi[short] = u[short]
+        u[short] -= 0.25 * length / np.hypot(dx[short], dy[short])
+        g[short], x[short], y[short], dx[short], dy[short] = gap(u[short], x_prev[short], y_prev[short])
+    lo = u.copy()
+    # 区间内用带保护的牛顿迭代，牛顿步跳出区间时改用二分
+    for _ in range(60):
+        if np.max(np.abs(g)) < newton_tolerance:
+            break
+        dg = -2 * ((x_prev - x) * dx + (y_prev - y) * dy)
+        hi = np.where(g < 0, u, hi)
+        lo = np.where(g < 0, lo, u)
+        step = np.where(dg != 0, g / np.where(dg != 0, dg, 1), 0)
+        u_new = u - step
+        outside = (u_new < lo) | (u_new > hi) | (dg == 0)
+        u = np.where(outside, (lo + hi) / 2, u_new)
+        g, x, y, dx, dy = gap(u)
+    return u, x, y, dx, dy
+
+# 盘入螺线上的跟随关系：前一个把手在极角theta处时，后一个把手(更靠外、距离为length)的极角F(theta)
+# 在theta_in到theta_max的网格上求一次，返回网格和对应的F；F单调递增，可以正查也可以反查
+def spiral_follower_table(geometry, length, theta_max):
+    b, theta_in = geometry["b"], geometry["theta_in"]
+    grid = np.arange(theta_in, theta_max + table_step, table_step)
+    follower = spiral_newton(grid, grid + length / (b * np.sqrt(1 + grid ** 2)), length, b)
+    return grid, follower
+
+# 已知螺线上一个把手的极角theta_known，从初值theta出发用牛顿法求距离为length的另一个把手的极角
+def spiral_newton(theta_known, theta, length, b):
+    x0, y0 = b * theta_known * np.cos(theta_known), b * theta_known * np.sin(theta_known)
+    for _ in range(50):
+        cos_t, sin_t = np.cos(theta), np.sin(theta)
+        ex, ey = b * theta * cos_t - x0, b * theta * sin_t - y0
+        g = ex ** 2 + ey ** 2 - length ** 2
+        if np.max(np.abs(g), initial=0) < newton_tolerance:
+            break
+        theta = theta - g / (2 * b * (ex * (cos_t - theta * sin_t) + ey * (sin_t + theta * cos_t)))
+    return theta
+
+# 由盘入螺线的跟随表求后一个把手的路径参数，不能用表的把手(前一个把手在圆弧上，或后一个把手会落到圆弧上)返回nan
+# 盘入：前一个把手极角theta，后一个把手极角F(theta)
+# 盘出：盘出螺线是盘入螺线关于原点的中心对称，同一极角处两点距离相同，但跟随方向相反，
+#       前一个把手极角phi时后一个把手极角为F的反函数F^-1(phi)，只在F^-1(phi) >= theta_in(仍在盘出螺线上)时可用
+def follower_by_symmetry(u_prev, length, table, geometry):
+    b, theta_in, turn_length = geometry["b"], geometry["theta_in"], geometry["turn_length"]
+    kappa = geometry["k"][3]
+    grid, follower = table
+    u = np.full_like(u_prev, np.nan)
+    coil_in = u_prev <= 0
+    theta = theta_in - kappa * u_prev[coil_in]
+    guess = np.interp(theta, grid, follower)
+    u[coil_in] = (theta_in - spiral_newton(theta, guess, length, b)) / kappa
+    coil_out = (u_prev > turn_length) & (theta_in + kappa * (u_prev - turn_length) >= follower[0])
+    phi = theta_in + kappa * (u_prev[coil_out] - turn_length)
+    guess = np.interp(phi, follower, grid)
+    u[coil_out] = turn_length + (spiral_newton(phi, guess, length, b) - theta_in) / kappa
+    return u
+
+# 一次求解全部时刻、全部把手的位置和速度，返回positions(T, N, 2)、velocities(T, N)和路径参数u(T, N)
+def simulate_timeline(times, geometry):
+    times = np.asarray(times, dtype=np.float64)
+    # 按(把手, 时刻)存放，每个把手的一整行是连续内存，返回时再转置
+    xs = np.empty((num_handles, len(times)))
+    ys = np.empty_like(xs)
+    vs = np.empty_like(xs)
+    us = np.empty_like(xs)
+
+    u = head_path_parameter(times, geometry)
+    x, y, dx, dy = path_point(u, geometry)
+    speed = np.hypot(dx, dy)  # |dP/du|
+    du = v_head / speed  # 龙头的du/dt
+    xs[0], ys[0], vs[0], us[0] = x, y, v_head, u
+    # 螺线上的把手用跟随表求，每种把手间距一张表，表的范围覆盖链条尾部走到的最大极角
+    theta_max = geometry["theta_in"] + spiral_angle_from_distance(
+        v_head * max(np.abs(times).max(), 0) + sum(handle_spacings), geometry)
+    tables = {length: spiral_follower_table(geometry, length, theta_max) for length in set(handle_spacings)}
+    for i in range(1, num_handles):
+        length = handle_spacings[i - 1]
+        u_next = follower_by_symmetry(u, length, tables[length], geometry)
+        # 圆弧附近的把手仍然逐个求解
+        rest = np.isnan(u_next)
+        if rest.any():
+            u_next[rest] = solve_follower(u[rest], x[rest], y[rest], speed[rest], length, geometry)[0]
+        x_next, y_next, dx_next, dy_next = path_point(u_next, geometry)
+        # 对 |P(u_prev)-P(u)|=L 求导：(P_prev-P)·(P_prev' du_prev - P' du) = 0
+        ex, ey = x - x_next, y - y_next
+        du = du * (ex * dx + ey * dy) / (ex * dx_next + ey * dy_next)
+        u, x, y, dx, dy = u_next, x_next, y_next, dx_next, dy_next
+        speed = np.hypot(dx, dy)
+        xs[i], ys[i], vs[i], us[i] = x, y, speed * np.abs(du), u
+    positions = np.stack((xs.T, ys.T), axis=-1)
+    return positions, vs.T, us.T
+
+# 由把手位置得到各节板凳的矩形：中心、长度方向单位向量、半长，返回数组形状为(T, N-1)
+# 这个函数和rectangles_overlap与根目录dragon.py中的相同(本脚本单独运行，不导入dragon.py)，修改时两处一起改
+def bench_rectangles(positions):
+    front = positions[:, :-1]
+    back = positions[:, 1:]
+    axis = back - front
+    axis /= np.hypot(axis[..., 0], axis[..., 1])[..., None]
+    center = (front + back) / 2
+    half_length = np.broadcast_to(np.array(section_lengths) / 2, center.shape[:2])
+    return center, axis, half_length
+
+# 两组有向矩形是否重叠(分离轴判定)，各参数的第一维是待判定的矩形对
+def rectangles_overlap(center_a, axis_a, half_a, center_b, axis_b, half_b):
+    d = center_b - center_a
+    normal_a = np.stack((-axis_a[:, 1], axis_a[:, 0]), axis=1)
+    normal_b = np.stack((-axis_b[:, 1], axis_b[:, 0]), axis=1)
+    overlap = np.ones(len(d), dtype=bool)
+    for w in (axis_a, normal_a, axis_b, normal_b):
+        # 两矩形在轴w上投影的半径之和
+        reach = (half_a * np.abs(np.sum(axis_a * w, axis=1)) + width / 2 * np.abs(np.sum(normal_a * w, axis=1))
+                 + half_b * np.abs(np.sum(axis_b * w, axis=1)) + width / 2 * np.abs(np.sum(normal_b * w, axis=1)))
+        overlap &= np.abs(np.sum(d * w, axis=1)) <= reach
+    return overlap
+
+# 检查调头区域内的板凳是否相互重叠(相邻两节在把手处铰接，不算碰撞)
+# 粗筛：把调头区域内各时刻的板凳中心放进均匀网格，网格边长为两板凳外接圆半径之和的上限，只比较相邻格子里的板凳
+# 细判：对粗筛留下的板凳对做有向矩形的分离轴判定
+# 返回发生碰撞的(时刻下标, 板凳a, 板凳b)，板凳编号从0开始
+def check_turn_collisions(positions, r_zone=r_turn_space):
+    center, axis, half_length = bench_rectangles(positions)
+    radius = np.hypot(half_length, width / 2)  # 外接圆半径
+    cell = 2 * radius.max()
+    reach = r_zone + radius.max()
+    # 只保留与调头区域相交的板凳
+    step, bench = np.nonzero(np.hypot(center[..., 0], center[..., 1]) <= r_zone + radius)
+    cx = center[step, bench]
+    grid_size = int(np.ceil(2 * reach / cell)) + 1
+    ix = ((cx[:, 0] + reach) // cell).astype(np.int64)
+    iy = ((cx[:, 1] + reach) // cell).astype(np.int64)
+    key = (step * grid_size + ix) * grid_size + iy
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    first, second = [], []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            neighbour = (step * grid_size + ix + ox) * grid_size + iy + oy
+            valid = (ix + ox >= 0) & (ix + ox < grid_size) & (iy + oy >= 0) & (iy + oy < grid_size)
+            start = np.searchsorted(sorted_key, neighbour, side='left')
+            stop = np.searchsorted(sorted_key, neighbour, side='right')
+            count = np.where(valid, stop - start, 0)
+            # 把每个板凳对应的[start, stop)展开成板凳对
+            a = np.repeat(np.arange(len(key)), count)
+            offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+            b = order[np.repeat(start, count) + offset]
+            first.append(a)
+            second.append(b)
+    a = np.concatenate(first)
+    b = np.concatenate(second)
+    keep = (bench[a] + 1 < bench[b])  # 去掉重复、自身和相邻的板凳对
+    a, b = a[keep], b[keep]
+    close = np.hypot(*(cx[a] - cx[b]).T) <= radius[step[a], bench[a]] + radius[step[b], bench[b]]
+    a, b = a[close], b[close]
+    sa, ba, bb = step[a], bench[a], bench[b]
+    hit = rectangles_overlap(center[sa, ba], axis[sa, ba], half_length[sa, ba],
+                             center[sa, bb], axis[sa, bb], half_length[sa, bb])
+    return np.column_stack((sa[hit], ba[hit], bb[hit]))
+
+# 可视化调头路径
+def plot_turn_path(times, positions, geometry):
+    fig, ax = plt.subplots(figsize=(10, 10))
+    ax.set_aspect('equal')
+
+    # 绘制整条路径
+    u = np.linspace(-8 * np.pi, geometry["turn_length"] + 8 * np.pi, 4000)
+    path_x, path_y, _, _ = path_point(u, geometry)
+    ax.plot(path_x, path_y, color='lightgray', linewidth=1, label='路径')
+    turn_circle = plt.Circle((0, 0), r_turn_space, color='r', fill=False, linestyle='--', label='调头空间边界')
+    ax.add_artist(turn_circle)
+
+    # 绘制若干时刻的板凳位置
+    for t in [-100, -50, 0, 50, 100]:
+        k = np.argmin(np.abs(times - t))
+        ax.plot(positions[k, :, 0], positions[k, :, 1], marker='.', markersize=2, label=f't={t}s')
+
+    ax.set_title('舞龙队调头路径')
+    ax.set_xlabel('x位置(m)')
+    ax.set_ylabel('y位置(m)')
+    ax.legend()
+    plt.grid(True)
+    plt.show()
+
+# 保存整秒时刻的结果到 Excel 文件
+def save_result(times, positions, velocities, excel_file_path='result4.xlsx'):
+    seconds = np.flatnonzero(np.isclose(times, np.round(times)))
+    result = pd.DataFrame({
+        "time": np.repeat(np.round(times[seconds]).astype(int), num_handles),
+        "section": np.tile(np.arange(1, num_handles + 1), len(seconds)),
+        "x_position": positions[seconds, :, 0].ravel(),
+        "y_position": positions[seconds, :, 1].ravel(),
+        "velocity": velocities[seconds].ravel(),
+    })
+    result.to_excel(excel_file_path, index=False)
+    print(f"文件已保存到: {excel_file_path}")
+
+
+if __name__ == '__main__':
+    geometry = build_turn_geometry()
+    print(f"调头圆弧半径: R1={geometry['r1']:.4f}m, R2={geometry['r2']:.4f}m, 调头路径长度{geometry['turn_length']:.4f}m")
+    times = t_start + np.arange(int(round((t_end - t_start) / dt)) + 1) * dt
+    start_time = time.perf_counter()
+    positions, velocities, _ = simulate_timeline(times, geometry)
+    print(f"计算{len(times)}个时刻 x {num_handles}个把手用时: {time.perf_counter() - start_time:.3f}秒")
+    start_time = time.perf_counter()
+    collisions = check_turn_collisions(positions)
+    print(f"调头区域碰撞检查用时: {time.perf_counter() - start_time:.4f}秒")
+    if len(collisions):
+        k, a, b = collisions[0]
+        print(f"t={times[k]}s时第{a + 1}节与第{b + 1}节板凳重叠，共{len(collisions)}处")
+    else:
+        print("调头区域内没有板凳重叠")
+    plot_turn_path(times, positions, geometry)
+    save_result(times, positions, velocities)
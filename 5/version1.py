@@ -20,52 +20,71 @@ section_lengths = [length_head] + [length_body] * (num_sections - 1)  # 各节
 def calculate_angular_velocity(v_head, r):
     return v_head / r
 
-# 计算螺线位置
-def calculate_position(t, r_initial, p, v_head):
-    r = r_initial + p * t / (2 * np.pi)
-    theta = t / r
-    x = r * np.cos(theta)
-    y = r * np.sin(theta)
-    return x, y, r
+# 一次模拟用到的全部数组，按(节数, 时间步数)预先分配，扫描不同龙头速度时重复使用，循环中不再申请新数组
+# 位置和极角按(节数, 时刻)存放，同一节板凳各时刻的数据连续，按节递推时每次处理一整行
+class ChainWorkspace:
+    __slots__ = ('num_sections', 'time_steps', 'times', 'r', 'theta', 'path_x', 'path_y', 'angles',
+                 'dx', 'dy', 'max_velocities')
 
-# 计算板凳在螺线上各个时刻的位置
-def calculate_section_position(t, section_index, path_x, path_y, angles):
-    prev_x = path_x[section_index - 1]
-    prev_y = path_y[section_index - 1]
-    section_length = section_lengths[section_index]
-    direction = angles[section_index - 1] + np.pi  # 板凳方向
-    x = prev_x + section_length * np.cos(direction)
-    y = prev_y + section_length * np.sin(direction)
-    return x, y
+    def __init__(self, num_sections, time_steps):
+        self.num_sections = num_sections
+        self.time_steps = time_steps
+        self.times = np.arange(time_steps, dtype=np.float64)
+        self.r = np.empty(time_steps)
+        self.theta = np.empty(time_steps)
+        self.path_x = np.empty((num_sections, time_steps))
+        self.path_y = np.empty((num_sections, time_steps))
+        self.angles = np.empty((num_sections, time_steps))
+        self.dx = np.empty((num_sections, time_steps - 1))
+        self.dy = np.empty((num_sections, time_steps - 1))
+        self.max_velocities = np.empty(time_steps)
 
 # 模拟盘出螺线运动，找到最大速度
-def simulate_spiral_out(v_head, time_steps):
-    path_x = np.zeros((time_steps, num_sections))
-    path_y = np.zeros((time_steps, num_sections))
-    angles = np.zeros((time_steps, num_sections))  # 用于计算方向
-    max_velocities = np.zeros(time_steps)
+# 所有时刻一起计算，结果写入workspace中的数组；返回的path_x, path_y为(时刻, 节数)的视图
+def simulate_spiral_out(v_head, time_steps, workspace=None):
+    if workspace is None:
+        workspace = ChainWorkspace(num_sections, time_steps)
+    ws = workspace
+    assert ws.num_sections == num_sections and ws.time_steps == time_steps
+    path_x, path_y, angles, theta = ws.path_x, ws.path_y, ws.angles, ws.theta
 
-    # 模拟各个时刻的位置和速度
-    for t in range(time_steps):
-        path_x[t, 0], path_y[t, 0], r = calculate_position(t, r_initial, p, v_head)
-        angles[t, 0] = np.arctan2(path_y[t, 0], path_x[t, 0])  # 计算龙头的方向
-        # 计算每节板凳的位置
-        for i in range(1, num_sections):
-            path_x[t, i], path_y[t, i] = calculate_section_position(t, i, path_x[t], path_y[t], angles[t])
-            angles[t, i] = np.arctan2(path_y[t, i], path_x[t, i])
-        # 计算每节板凳的速度
-        if t > 0:
-            velocities = np.sqrt((path_x[t] - path_x[t-1])**2 + (path_y[t] - path_y[t-1])**2)
-            max_velocities[t] = np.max(velocities)
-        return path_x, path_y, max_velocities
+    # 龙头位置：t秒内沿螺线走过的路程s = v_head*t，半径r = r_initial + p*s/(2π)，极角s/r
+    np.multiply(ws.times, v_head, out=theta)  # 先把路程s存在theta中
+    np.multiply(theta, p / (2 * np.pi), out=ws.r)
+    ws.r += r_initial
+    np.divide(theta, ws.r, out=theta)
+    np.cos(theta, out=path_x[0])
+    path_x[0] *= ws.r
+    np.sin(theta, out=path_y[0])
+    path_y[0] *= ws.r
+    np.arctan2(path_y[0], path_x[0], out=angles[0])  # 计算龙头的方向
+    # 计算每节板凳的位置：沿前一节与原点连线的反方向偏移该节板凳长度
+    for i in range(1, num_sections):
+        np.add(angles[i - 1], np.pi, out=theta)  # 板凳方向
+        np.cos(theta, out=path_x[i])
+        path_x[i] *= section_lengths[i]
+        path_x[i] += path_x[i - 1]
+        np.sin(theta, out=path_y[i])
+        path_y[i] *= section_lengths[i]
+        path_y[i] += path_y[i - 1]
+        np.arctan2(path_y[i], path_x[i], out=angles[i])
+    # 计算每节板凳的速度：相邻两个时刻的位移
+    np.subtract(path_x[:, 1:], path_x[:, :-1], out=ws.dx)
+    np.subtract(path_y[:, 1:], path_y[:, :-1], out=ws.dy)
+    np.hypot(ws.dx, ws.dy, out=ws.dx)
+    ws.max_velocities[0] = 0
+    np.max(ws.dx, axis=0, out=ws.max_velocities[1:])
+    return path_x.T, path_y.T, ws.max_velocities
 
-# 找到不超过2m/s的最大速度
+# 找到不超过2m/s的最大速度，所有候选速度共用一个workspace
 def find_maximum_head_velocity(time_steps):
+    workspace = ChainWorkspace(num_sections, time_steps)
     for v_head in np.arange(0.5, 3.0, 0.01):  # 逐步增加龙头速度
-        _, _, max_velocities = simulate_spiral_out(v_head, time_steps)
-        if np.all(max_velocities <= v_max_possible):
+        _, _, max_velocities = simulate_spiral_out(v_head, time_steps, workspace)
+        if max_velocities.max() <= v_max_possible:
             print(f"找到最大龙头速度 v_head = {v_head:.2f} m/s")
             return v_head
+    print("在0.50~2.99m/s范围内没有满足速度限制的龙头速度")
     return None
 
 # 模拟盘出过程,找到最大龙头速度
@@ -0,0 +1,172 @@
+#自适应步长：根据监测量(板凳最小间隙、把手最大速度)的局部误差估计放大或缩小步长，只在需要的地方用小步长
+#误差估计：用前两个已接受时刻的监测值线性外推，与新时刻的实际值之差约为 m''*dt^2/2
+#误差容差为 tolerance + relative*|监测值 - 阈值|：间隙离0还远时不必精确跟踪它(最小间隙换了板凳对时有折点)，
+#外圈可以走大步；另外每步板凳朝向角的变化不超过max_turn，保证整秒结果的插值精度
+#监测量接近阈值(如间隙接近0)时按剩余距离和变化率限制步长，越过阈值时二分定位事件时刻
+#步长不小于dt_min，只有以事件时刻结束的最后一步例外(事件时刻由二分定位到event_tolerance)
+#整秒的结果由已接受时刻的样本用三次样条插值得到(trajectory.py)：先在相邻样本的中点和样本本身检查插值的位置和速度误差，
+#超过dense_tolerance的区间插入中点处的样本，直到全部满足
+#用法: python adaptive.py
+import time
+import numpy as np
+
+import dragon
+import trajectory
+
+# 定义常量
+dt_initial = 1.0  # 初始步长(s)
+dt_min = 1e-3  # 最小步长(s)
+dt_max = 10.0  # 最大步长(s)
+max_growth = 2.0  # 每步最多放大的倍数
+safety = 0.9  # 步长调整的安全系数
+event_tolerance = 1e-6  # 事件时刻的定位精度(s)
+max_turn = 0.5  # 每步各节板凳朝向角最多变化的角度(rad)，保证插值得到的整秒结果的精度
+dense_tolerance = 1e-6  # 插值结果的误差上限(位置m，速度m/s)，结果只保留到6位小数
+max_rounds = 40  # 插值检查最多加密的轮数
+
+# 问题2的监测量：龙头附近板凳与其余板凳的最小间隙(小于0即碰撞，碰撞后停止)，以及把手的最大速度
+problem2_monitors = [
+    {"name": "clearance", "func": lambda positions, velocities: dragon.chain_clearance(positions),
+     "tolerance": 2e-3, "relative": 0.25, "threshold": 0.0, "stop": True},
+    {"name": "max_speed", "func": lambda positions, velocities: velocities.max(axis=1),
+     "tolerance": 1e-4, "relative": 0.0, "threshold": None, "stop": False},
+]
+
+# 问题2的状态：把手严格放在螺线上的盘入模型
+def problem2_state(times):
+    _, positions, velocities = dragon.solve_spiral_chain(times)
+    return positions, velocities
+
+# 在时刻t求状态和各监测量
+def evaluate(state, monitors, t):
+    positions, velocities = state(np.array([t]))
+    values = np.array([monitor["func"](positions, velocities)[0] for monitor in monitors])
+    return positions[0], velocities[0], values
+
+# 各节板凳的朝向角，positions为(N, 2)
+def bench_angles(positions):
+    links = np.diff(positions, axis=0)
+    return np.arctan2(links[:, 1], links[:, 0])
+
+# 二分定位监测量k越过阈值的时刻，返回越过后那一侧的时刻和状态
+def locate_event(state, monitors, k, t_lo, values_lo, t_hi, sample_hi):
+    threshold = monitors[k]["threshold"]
+    side = np.sign(values_lo[k] - threshold)
+    while t_hi - t_lo > event_tolerance:
+        t_mid = (t_lo + t_hi) / 2
+        sample = evaluate(state, monitors, t_mid)
+        if np.sign(sample[2][k] - threshold) == side:
+            t_lo = t_mid
+        else:
+            t_hi, sample_hi = t_mid, sample
+    return t_hi, sample_hi
+
+# 自适应步长求解，返回已接受的时刻、位置、速度、监测值，以及事件列表[(名称, 时刻)]和被拒绝的步数
+def adaptive_simulate(state, monitors, t_start, t_stop, dt=dt_initial):
+    tolerances = np.array([monitor["tolerance"] for monitor in monitors])
+    relative = np.array([monitor["relative"] for monitor in monitors])
+    thresholds = [monitor["threshold"] for monitor in monitors]
+    offsets = np.array([0.0 if threshold is None else threshold for threshold in thresholds])
+    positions, velocities, values = evaluate(state, monitors, t_start)
+    times, samples = [t_start], [(positions, velocities, values)]
+    events = []
+    rejected = 0
+    t = t_start
+    while t < t_stop:
+        # 监测量朝阈值变化时，步长不超过按当前变化率到达阈值所需时间的一半
+        if len(times) >= 2:
+            rate = (samples[-1][2] - samples[-2][2]) / (times[-1] - times[-2])
+            for k, threshold in enumerate(thresholds):
+                gap = samples[-1][2][k] - threshold if threshold is not None else 0
+                if threshold is not None and gap * rate[k] < 0:
+                    dt = min(dt, max(dt_min, 0.5 * abs(gap / rate[k])))
+            # 按上一步中转得最快的板凳限制步长
+            turn = np.abs(np.angle(np.exp(1j * (bench_angles(samples[-1][0]) - bench_angles(samples[-2][0]))))).max()
+            if turn > 0:
+                dt = min(dt, max(dt_min, max_turn * (times[-1] - times[-2]) / turn))
+        dt = min(dt, t_stop - t)
+        t_new = t + dt
+        sample = evaluate(state, monitors, t_new)
+        # 局部误差估计
+        ratio = 0.0
+        if len(times) >= 2:
+            predicted = samples[-1][2] + (samples[-1][2] - samples[-2][2]) * dt / (times[-1] - times[-2])
+            ratio = np.max(np.abs(sample[2] - predicted) / (tolerances + relative * np.abs(samples[-1][2] - offsets)))
+        if ratio > 1 and dt > dt_min:
+            dt = max(dt_min, dt * max(0.2, safety / np.sqrt(ratio)))
+            rejected += 1
+            continue
+        # 检查是否越过阈值
+        stop = False
+        for k, threshold in enumerate(thresholds):
+            if threshold is None:
+                continue
+            if np.sign(samples[-1][2][k] - threshold) != np.sign(sample[2][k] - threshold):
+                t_new, sample = locate_event(state, monitors, k, t, samples[-1][2], t_new, sample)
+                events.append((monitors[k]["name"], t_new))
+                stop = monitors[k]["stop"]
+                break
+        times.append(t_new)
+        samples.append(sample)
+        t = t_new
+        if stop:
+            break
+        dt = min(dt_max, dt * min(max_growth, safety / np.sqrt(max(ratio, 1e-12))))
+    positions = np.array([sample[0] for sample in samples])
+    velocities = np.array([sample[1] for sample in samples])
+    values = np.array([sample[2] for sample in samples])
+    return np.array(times), positions, velocities, values, events, rejected
+
+# 检查样本插值的误差：相邻样本中点处的位置和速度与直接求解比较，样本处的速度与样本比较(样本处的位置没有误差)
+# 误差超过tolerance的区间插入中点处的样本，返回加密后的时刻、位置、速度和最后一轮的最大误差
+def refine_samples(state, times, positions, velocities, tolerance=dense_tolerance):
+    error = np.inf
+    for _ in range(max_rounds):
+        keyframes = trajectory.keyframes_from_samples(times, positions)
+        middle = (times[:-1] + times[1:]) / 2
+        mid_positions, mid_velocities = state(middle)
+        approx_positions, approx_velocities = trajectory.reconstruct(keyframes, middle)
+        _, sample_velocities = trajectory.reconstruct(keyframes, times)
+        diff = approx_positions - mid_positions
+        mid_error = np.maximum(np.hypot(diff[..., 0], diff[..., 1]).max(axis=1),
+                               np.abs(approx_velocities - mid_velocities).max(axis=1))
+        sample_error = np.abs(sample_velocities - velocities).max(axis=1)
+        # 每个区间的误差取中点和两端样本中的最大值
+        interval_error = np.maximum(mid_error, np.maximum(sample_error[:-1], sample_error[1:]))
+        error = interval_error.max()
+        split = np.flatnonzero(interval_error > tolerance)
+        if len(split) == 0:
+            break
+        times = np.insert(times, split + 1, middle[split])
+        positions = np.insert(positions, split + 1, mid_positions[split], axis=0)
+        velocities = np.insert(velocities, split + 1, mid_velocities[split], axis=0)
+    return times, positions, velocities, error
+
+# 由已接受的样本插值得到固定间隔时刻(如整秒)的位置和速度
+def dense_output(times, positions, report_times):
+    keyframes = trajectory.keyframes_from_samples(times, positions)
+    return trajectory.reconstruct(keyframes, report_times)
+
+
+if __name__ == '__main__':
+    start_time = time.perf_counter()
+    times, positions, velocities, values, events, rejected = adaptive_simulate(
+        problem2_state, problem2_monitors, 0.0, 440.0)
+    elapsed = time.perf_counter() - start_time
+    steps = np.diff(times)[:-1] if events else np.diff(times)
+    event_step = f"(不含以事件结束的最后一步{times[-1] - times[-2]:.2e}s)" if events else ""
+    print(f"自适应步长: 接受{len(times)}步，拒绝{rejected}步，用时{elapsed:.2f}秒，"
+          f"最小步长{steps.min():.2e}s{event_step}，最大步长{steps.max():.2f}s")
+    for name, t in events:
+        print(f"事件{name}: t={t:.6f}s")
+    # 整秒时刻的结果由插值得到，与直接求解比较
+    start_time = time.perf_counter()
+    num_accepted = len(times)
+    times, positions, velocities, error = refine_samples(problem2_state, times, positions, velocities)
+    print(f"插值检查: 加入{len(times) - num_accepted}个样本，用时{time.perf_counter() - start_time:.2f}秒，"
+          f"检查点最大误差{error:.2e}")
+    report_times = np.arange(0, int(times[-1]) + 1, dtype=np.float64)
+    dense_positions, dense_velocities = dense_output(times, positions, report_times)
+    exact_positions, exact_velocities = problem2_state(report_times)
+    print(f"整秒结果插值误差: 位置{np.abs(dense_positions - exact_positions).max():.2e}m, "
+          f"速度{np.abs(dense_velocities - exact_velocities).max():.2e}m/s")
@@ -0,0 +1,134 @@
+#链条形状表：螺线固定时，整条龙的形状只由龙头极角决定，与时间和速度无关
+#对每个螺距在龙头极角的网格上求解一次全部把手的极角，以及它们对龙头极角的导数(由距离约束求导得到)
+#查询时用三次Hermite插值，任意速度、步长、时间段的模拟都变成查表；导数表同时给出速度
+#误差控制：在每个区间中点把插值和直接求解比较，误差(换算成沿螺线的距离)超过容差的区间对分，直到全部满足
+#表按参数的哈希缓存在.atlas_cache/
+#用法: python atlas.py
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+import dragon
+
+# 定义常量
+cache_dir = '.atlas_cache'  # 缓存目录
+tolerance = 1e-8  # 插值误差上限(沿螺线的距离，m)
+initial_step = 0.5  # 初始网格间距(rad)
+max_rounds = 30  # 最多加密的轮数
+r_min = 2.0  # 表覆盖的龙头最小半径(m)，问题2碰撞时龙头半径约2.3m
+
+# 龙头极角为head_theta(G,)时各把手的极角和它们对龙头极角的导数，形状(G, N)，N = len(handle_spacings) + 1
+# 对 |P_i - P_{i-1}| = L 求导：dtheta_i/dtheta_{i-1} = (e·P_{i-1}')/(e·P_i')，e = P_{i-1} - P_i
+def chain_angles(head_theta, b, handle_spacings=dragon.handle_spacings):
+    theta = np.asarray(head_theta, dtype=np.float64)
+    thetas = np.empty((len(theta), len(handle_spacings) + 1))
+    slopes = np.empty((len(theta), len(handle_spacings) + 1))
+    slope = np.ones(len(theta))
+    x, y, dx, dy = dragon.spiral_point(theta, b)
+    thetas[:, 0], slopes[:, 0] = theta, slope
+    for i in range(1, len(handle_spacings) + 1):
+        theta = dragon.spiral_follower(theta, x, y, dx, dy, handle_spacings[i - 1], b)
+        xn, yn, dxn, dyn = dragon.spiral_point(theta, b)
+        ex, ey = x - xn, y - yn
+        slope = slope * (ex * dx + ey * dy) / (ex * dxn + ey * dyn)
+        x, y, dx, dy = xn, yn, dxn, dyn
+        thetas[:, i], slopes[:, i] = theta, slope
+    return thetas, slopes
+
+# 三次Hermite插值，grid为递增的节点(G,)，values, slopes为(G, N)，返回query处的值和导数(len(query), N)
+def hermite(grid, values, slopes, query):
+    k = np.clip(np.searchsorted(grid, query, side='right') - 1, 0, len(grid) - 2)
+    h = (grid[k + 1] - grid[k])[:, None]
+    s = (query - grid[k])[:, None] / h
+    y0, y1 = values[k], values[k + 1]
+    m0, m1 = slopes[k] * h, slopes[k + 1] * h
+    s2, s3 = s * s, s * s * s
+    value = (2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * m0 + (-2 * s3 + 3 * s2) * y1 + (s3 - s2) * m1
+    derivative = ((6 * s2 - 6 * s) * (y0 - y1) + (3 * s2 - 4 * s + 1) * m0 + (3 * s2 - 2 * s) * m1) / h
+    return value, derivative
+
+# 建表：龙头极角从theta_min到theta_max，误差超过容差的区间对分
+def build_atlas(p=dragon.p, theta_min=None, theta_max=dragon.theta_0, handle_spacings=dragon.handle_spacings,
+                tolerance=tolerance):
+    b = p / (2 * np.pi)
+    if theta_min is None:
+        theta_min = r_min / b
+    grid = np.linspace(theta_min, theta_max, int(np.ceil((theta_max - theta_min) / initial_step)) + 1)
+    thetas, slopes = chain_angles(grid, b, handle_spacings)
+    todo = np.ones(len(grid) - 1, dtype=bool)  # 需要检查的区间
+    max_error = 0.0
+    for _ in range(max_rounds):
+        left = np.nonzero(todo)[0]
+        if len(left) == 0:
+            break
+        middle = (grid[left] + grid[left + 1]) / 2
+        exact, exact_slopes = chain_angles(middle, b, handle_spacings)
+        approx, _ = hermite(grid, thetas, slopes, middle)
+        # 极角误差乘以|P'(theta)| = b*sqrt(1+theta^2)，换算成沿螺线的距离
+        error = (np.abs(approx - exact) * b * np.sqrt(1 + exact ** 2)).max(axis=1)
+        split = error > tolerance
+        max_error = max(max_error, error[~split].max(initial=0))  # 已满足容差的区间中的最大误差
+        # 插入需要对分的区间的中点，新的两个半区间下一轮再检查
+        grid = np.insert(grid, left[split] + 1, middle[split])
+        thetas = np.insert(thetas, left[split] + 1, exact[split], axis=0)
+        slopes = np.insert(slopes, left[split] + 1, exact_slopes[split], axis=0)
+        todo = np.zeros(len(grid) - 1, dtype=bool)
+        new_left = left[split] + np.arange(np.count_nonzero(split))  # 插入后原区间左端点的新下标
+        todo[new_left] = True
+        todo[new_left + 1] = True
+    return {"p": p, "grid": grid, "thetas": thetas, "slopes": slopes, "max_error": max_error}
+
+# 读取缓存的表，没有时建表并缓存
+def load_atlas(p=dragon.p, theta_min=None, theta_max=dragon.theta_0, handle_spacings=dragon.handle_spacings,
+               tolerance=tolerance):
+    params = {"p": p, "theta_min": theta_min, "theta_max": theta_max,
+              "handle_spacings": [float(length) for length in handle_spacings], "tolerance": tolerance,
+              "num_handles": len(handle_spacings) + 1}
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"atlas-{digest}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            return {name: data[name] if data[name].ndim else data[name].item() for name in data.files}
+    atlas = build_atlas(p, theta_min, theta_max, handle_spacings, tolerance)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(cache_path, **atlas)
+    return atlas
+
+# 查表得到龙头极角为head_theta时各把手的极角和对龙头极角的导数
+def lookup(atlas, head_theta):
+    head_theta = np.atleast_1d(np.asarray(head_theta, dtype=np.float64))
+    grid = atlas["grid"]
+    if head_theta.min() < grid[0] or head_theta.max() > grid[-1]:
+        raise ValueError(f"龙头极角超出表的范围[{grid[0]:.4f}, {grid[-1]:.4f}]")
+    return hermite(grid, atlas["thetas"], atlas["slopes"], head_theta)
+
+# 用表代替dragon.solve_spiral_chain，返回值相同：各把手极角(T, N)、位置(T, N, 2)和速度(T, N)
+def simulate(atlas, times, v_head=dragon.v_head, theta_0=dragon.theta_0):
+    b = atlas["p"] / (2 * np.pi)
+    head_theta = dragon.head_spiral_angle(np.atleast_1d(times), atlas["p"], v_head, theta_0)
+    thetas, slopes = lookup(atlas, head_theta)
+    x, y, dx, dy = dragon.spiral_point(thetas, b)
+    omega = v_head / (b * np.sqrt(1 + head_theta ** 2))  # 龙头极角变化的速率
+    velocities = np.hypot(dx, dy) * np.abs(slopes) * omega[:, None]
+    return thetas, np.stack((x, y), axis=-1), velocities
+
+
+if __name__ == '__main__':
+    start_time = time.perf_counter()
+    atlas = build_atlas()
+    build_time = time.perf_counter() - start_time
+    print(f"p={atlas['p']}: 网格{len(atlas['grid'])}个节点，建表用时{build_time:.2f}秒，"
+          f"中点误差最大{atlas['max_error']:.2e}m")
+    # 与直接求解比较：问题1(0~300s每秒)，以及更密的时间步
+    for label, times in (("0~300s每1s", np.arange(0, 301, dtype=np.float64)),
+                         ("0~412s每0.1s", np.arange(0, 4121) * 0.1)):
+        start_time = time.perf_counter()
+        _, positions, velocities = simulate(atlas, times)
+        lookup_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        _, exact_positions, exact_velocities = dragon.solve_spiral_chain(times)
+        solve_time = time.perf_counter() - start_time
+        print(f"{label}: 查表{lookup_time:.3f}秒，直接求解{solve_time:.3f}秒，"
+              f"位置误差{np.abs(positions - exact_positions).max():.2e}m，速度误差{np.abs(velocities - exact_velocities).max():.2e}m/s")
@@ -0,0 +1,143 @@
+#多场景批量运行：读取场景清单，找出共用龙头轨迹和链条前缀的场景，共用部分只算一次，其余分给进程池
+#结果按场景参数的哈希写入目录，catalogue.json记录每个场景的参数和文件，已算过的场景不再重算
+#用法: python batch_runner.py 清单.json [输出目录]
+#清单格式(JSON)：defaults为公共参数，scenarios逐个列出，sweep按笛卡尔积展开，两者都可以省略
+#  {"defaults": {"t_total": 300, "dt": 0.1},
+#   "scenarios": [{"p": 0.55}, {"p": 0.55, "num_sections": 100}],
+#   "sweep": {"p": [0.45, 0.5, 0.55], "length_body": [2.2, 2.3]}}
+#可用参数: p, v_head, r_0(默认从第16圈开始，即16*p), t_total, dt, num_sections, length_head, length_body, section_lengths
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+import numpy as np
+
+import dragon
+import guard
+import storage
+
+# 定义常量
+default_params = {"p": dragon.p, "v_head": dragon.v_head, "t_total": 300, "dt": 1.0,
+                  "num_sections": dragon.num_sections, "length_head": dragon.length_head,
+                  "length_body": dragon.length_body}
+num_workers = os.cpu_count() or 1  # 进程数
+precision = storage.default_precision  # 结果的存储精度
+
+# 展开清单中的全部场景
+def expand_manifest(manifest):
+    defaults = manifest.get("defaults", {})
+    scenarios = [dict(defaults, **scenario) for scenario in manifest.get("scenarios", [])]
+    sweep = manifest.get("sweep", {})
+    if sweep:
+        names = list(sweep)
+        for values in itertools.product(*(sweep[name] for name in names)):
+            scenarios.append(dict(defaults, **dict(zip(names, values))))
+    return scenarios
+
+# 补全默认值并整理成统一形式：section_lengths为完整列表
+def normalize(scenario):
+    params = dict(default_params, **scenario)
+    if "section_lengths" not in scenario:
+        params["section_lengths"] = [params["length_head"]] + [params["length_body"]] * (params["num_sections"] - 1)
+    params["section_lengths"] = [float(length) for length in params["section_lengths"]]
+    if "r_0" not in params:
+        params["r_0"] = dragon.start_turns * params["p"]
+    return {key: params[key] for key in ("p", "v_head", "r_0", "t_total", "dt", "section_lengths")}
+
+# 场景哈希：参数按键排序后的JSON的sha1
+def scenario_hash(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+# 按龙头轨迹分组：p, v_head, r_0, dt相同的场景龙头位置相同，时间短的是时间长的前缀
+def group_by_head(scenarios):
+    groups = {}
+    for params in scenarios:
+        key = (params["p"], params["v_head"], params["r_0"], params["dt"])
+        groups.setdefault(key, []).append(params)
+    return list(groups.values())
+
+# 两个长度列表的公共前缀长度
+def common_prefix(a, b):
+    k = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        k += 1
+    return k
+
+# 计算一组共用龙头轨迹的场景：按板凳长度列表排序，使有公共前缀的场景相邻，前缀部分直接复用
+# 返回各场景的目录项和实际计算的把手-时刻数
+def run_group(group, output_dir):
+    group = sorted(group, key=lambda params: params["section_lengths"])
+    first = group[0]
+    dt = first["dt"]
+    num_steps = int(round(max(params["t_total"] for params in group) / dt)) + 1
+    times = np.arange(num_steps) * dt
+    previous_lengths = []
+    previous = None
+    entries = []
+    work = 0
+    for params in group:
+        lengths = params["section_lengths"]
+        shared = common_prefix(previous_lengths, lengths)
+        positions = np.empty((num_steps, len(lengths), 2))
+        if shared > 0:
+            positions[:, :shared] = previous[:, :shared]
+        guard.guarded_solve_chain(lengths, first["p"])(times, first["p"], first["v_head"], first["r_0"], lengths,
+                                                       out=positions, first=shared)
+        work += num_steps * (len(lengths) - shared)
+        previous_lengths, previous = lengths, positions
+        # 时间较短的场景取前缀
+        steps = int(round(params["t_total"] / dt)) + 1
+        key = scenario_hash(params)
+        file_path = os.path.join(output_dir, f"{key}.npz")
+        errors = storage.save_trajectory(file_path, times[:steps], positions[:steps],
+                                         dragon.chain_velocities(positions[:steps], dt), precision)
+        entries.append((key, {"params": params, "file": os.path.basename(file_path), "errors": errors}))
+    return entries, work
+
+def run_group_task(args):
+    return run_group(*args)
+
+# 运行清单中的全部场景，已经在目录中的场景跳过
+def run_batch(manifest, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    catalogue_path = os.path.join(output_dir, 'catalogue.json')
+    catalogue = {}
+    if os.path.exists(catalogue_path):
+        with open(catalogue_path, encoding='utf-8') as f:
+            catalogue = json.load(f)
+    scenarios = {}
+    for scenario in expand_manifest(manifest):
+        params = normalize(scenario)
+        key = scenario_hash(params)
+        if key not in catalogue or not os.path.exists(os.path.join(output_dir, catalogue[key]["file"])):
+            scenarios[key] = params  # 清单里重复的场景也只算一次
+    groups = group_by_head(list(scenarios.values()))
+    naive = sum((int(round(params["t_total"] / params["dt"])) + 1) * len(params["section_lengths"])
+                for params in scenarios.values())
+    work = 0
+    if groups:
+        with Pool(min(num_workers, len(groups))) as pool:
+            for entries, group_work in pool.imap_unordered(run_group_task, [(group, output_dir) for group in groups]):
+                catalogue.update(entries)
+                work += group_work
+    with open(catalogue_path, 'w', encoding='utf-8') as f:
+        json.dump(catalogue, f, ensure_ascii=False, indent=1)
+    return len(scenarios), len(groups), work, naive
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("用法: python batch_runner.py 清单.json [输出目录]")
+        sys.exit(2)
+    with open(sys.argv[1], encoding='utf-8') as f:
+        manifest = json.load(f)
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else 'batch_results'
+    start_time = time.perf_counter()
+    count, num_groups, work, naive = run_batch(manifest, output_dir)
+    print(f"新计算{count}个场景，{num_groups}条龙头轨迹，"
+          f"实际计算{work}个把手-时刻(逐个独立计算需{naive}个)，用时{time.perf_counter() - start_time:.2f}秒")
@@ -0,0 +1,132 @@
+#连续碰撞检测：判断两个时间步之间板凳有没有穿过彼此，而不只是检查每个时间步上是否重叠
+#2/version3-lezai.py用1秒步长逐步检查，两个时间步之间的碰撞会被漏掉
+#做法：每对候选板凳的间隙c(t)随时间变化的速率不超过两板凳上各点速度上界之和L
+#子区间[a, a+h]上c(t) >= (c(a) + c(a+h) - L*h) / 2，下界大于0的子区间一定没有接触(对所有板凳对同时成立时该子区间安全)
+#速度上界是严格的(盘入螺线上)：
+#  把手速度沿龙身不增(螺线越往外曲率越小，后把手处弦与切线的夹角不大于前把手处)，都不超过龙头速度v_head
+#  板凳中点速度不超过v_head；板凳转动的角速度不超过 v_head*dpsi/把手间距，dpsi为两把手处螺线切线方向之差
+#  (切线方向角psi = theta + arctan(theta))；盘入时各板凳的dpsi随时间增大，子区间上取右端点的值
+#  板凳上各点速度不超过 v_head + 角速度*中心到角点的距离
+#子区间的两端点都是求解过的采样时刻，细分时只求新增的采样时刻
+#间隙在采样时刻上不大于0时，在它与前一个采样时刻之间对间隙的符号二分，得到接触时刻
+#细分到time_tolerance仍不能确认安全的子区间，把它的左端点作为可能的接触时刻报告(不丢弃)
+#只检查前num_front节板凳与其余板凳之间的板凳对(盘入时最先碰撞的是龙头附近的板凳)，后面的板凳之间不检查
+#用法: python collision.py [区间长度]
+import sys
+import time
+import numpy as np
+
+import dragon
+
+# 定义常量
+interval = 10.0  # 每次检查的时间区间长度(s)
+num_samples = 16  # 每个区间(或需要细分的子区间)最多等分的份数
+contact_tolerance = 1e-9  # 间隙小于该值视为接触(m)
+time_tolerance = 1e-6  # 接触时刻的精度(s)
+num_front = 3  # 候选板凳对：前几节板凳与其余不相邻的板凳
+
+# 问题2的状态：把手严格放在螺线上的盘入模型，返回各把手极角和位置
+def problem2_state(times):
+    return dragon.solve_spiral_chain(times)[:2]
+
+def problem2_positions(times):
+    return problem2_state(times)[1]
+
+# 各节板凳上各点速度的上界(T, N-1)，thetas为子区间右端点的把手极角(T, N)
+def bench_speed_bounds(thetas, v_head=dragon.v_head, section_lengths=dragon.section_lengths):
+    psi = thetas + np.arctan(thetas)  # 螺线切线的方向角
+    lengths = np.asarray(section_lengths[:thetas.shape[1] - 1])
+    spacings = lengths - 2 * dragon.hole_offset
+    reach = np.hypot(lengths / 2, dragon.width / 2)  # 板凳中心到角点的距离
+    return v_head * (1 + np.abs(np.diff(psi, axis=1)) / spacings * reach)
+
+# 子区间[t_k, t_k+1]上每对候选板凳间隙的下界，clearance为各采样时刻的间隙(T, F, N-1)，bounds为速度上界(T, N-1)
+# 返回每个子区间的下界(T-1,)和按每份L*h约为两端间隙之和估计需要细分的份数(T-1,)
+def interval_lower_bounds(times, clearance, bounds):
+    h = np.diff(times)[:, None, None]
+    rate = (bounds[1:, :clearance.shape[1], None] + bounds[1:, None, :]) * h  # 两板凳速度上界之和乘以时长
+    total = clearance[:-1] + clearance[1:]
+    lower = ((total - rate) / 2).min(axis=(1, 2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        need = np.where(total > 0, rate / total, np.inf).max(axis=(1, 2))  # 自身和相邻板凳的间隙为inf，比值为0
+    return lower, need
+
+# 在间隙由正变为不大于0的区间[lo, hi]内二分，返回接触时刻和求解的时刻数
+def locate_contact(positions_fn, lo, hi):
+    evaluations = 0
+    while hi - lo > time_tolerance:
+        mid = (lo + hi) / 2
+        clearance = dragon.pair_clearance(positions_fn(np.array([mid])), num_front)
+        evaluations += 1
+        if clearance.min() <= contact_tolerance:
+            hi = mid
+        else:
+            lo = mid
+    return hi, evaluations
+
+# 检查区间[t0, t1]内是否发生接触，返回(最早接触时刻, 确认没有接触的时刻, 求解的时刻数)，没有接触时前两项为None和t1
+# 每一轮把所有待细分子区间的新增采样时刻合在一起求解，子区间端点的结果沿用
+# 第一个不能确认安全的子区间的左端点之前都已确认没有接触；采样到接触时从该点二分到间隙变号处，
+# 没有采样到接触时把该点作为可能的接触时刻
+def continuous_collision(state_fn, t0, t1):
+    times = np.linspace(t0, t1, num_samples + 1)
+    thetas, positions = state_fn(times)
+    evaluations = len(times)
+    clearance = dragon.pair_clearance(positions, num_front)
+    bounds = bench_speed_bounds(thetas)
+    while True:
+        # 只检查第一个采样到接触的时刻之前的子区间
+        touching = np.flatnonzero(clearance.min(axis=(1, 2)) <= contact_tolerance)
+        m = touching[0] if len(touching) else len(times) - 1
+        lower, need = interval_lower_bounds(times[:m + 1], clearance[:m + 1], bounds[:m + 1])
+        refine = np.flatnonzero((lower <= contact_tolerance) & (np.diff(times[:m + 1]) > time_tolerance))
+        if len(refine) == 0:
+            break
+        # 只求新增的采样时刻，再和原有的采样时刻按时间合并
+        pieces = np.clip(np.ceil(need[refine]), 2, num_samples).astype(int)
+        new_times = np.concatenate([np.linspace(times[k], times[k + 1], n + 1)[1:-1] for k, n in zip(refine, pieces)])
+        new_thetas, new_positions = state_fn(new_times)
+        evaluations += len(new_times)
+        order = np.argsort(np.concatenate((times, new_times)), kind='stable')
+        times = np.concatenate((times, new_times))[order]
+        clearance = np.concatenate((clearance, dragon.pair_clearance(new_positions, num_front)))[order]
+        bounds = np.concatenate((bounds, bench_speed_bounds(new_thetas)))[order]
+    unresolved = np.flatnonzero(lower <= contact_tolerance)  # 细分到time_tolerance仍不能确认安全的子区间
+    safe_until = times[unresolved[0]] if len(unresolved) else times[m]
+    if len(touching) == 0:
+        return (safe_until if len(unresolved) else None), safe_until, evaluations
+    if m == 0:
+        return times[0], times[0], evaluations
+    contact, count = locate_contact(lambda t: state_fn(t)[1], safe_until if len(unresolved) else times[m - 1], times[m])
+    return contact, safe_until, evaluations + count
+
+# 按区间依次检查，返回(最早接触时刻, 确认没有接触的时刻, 求解的总时刻数)
+def find_first_collision(state_fn, t_start, t_stop, interval=interval):
+    total = 0
+    t = t_start
+    while t < t_stop:
+        t_end = min(t + interval, t_stop)
+        contact, safe_until, evaluations = continuous_collision(state_fn, t, t_end)
+        total += evaluations
+        if contact is not None:
+            return contact, safe_until, total
+        t = t_end
+    return None, t_stop, total
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        interval = float(sys.argv[1])
+    start_time = time.perf_counter()
+    contact, safe_until, evaluations = find_first_collision(problem2_state, 0.0, 440.0, interval)
+    elapsed = time.perf_counter() - start_time
+    if contact is None:
+        print(f"没有发生碰撞(求解{evaluations}个时刻，用时{elapsed:.2f}秒)")
+    else:
+        print(f"最早接触时刻: t={contact:.6f}s，t<{safe_until:.6f}s已确认没有接触"
+              f"(区间长度{interval}s，求解{evaluations}个时刻，用时{elapsed:.2f}秒)")
+    # 对比：只在整秒时刻检查重叠
+    times = np.arange(0, 441, dtype=np.float64)
+    overlap = np.nonzero(dragon.chain_clearance(problem2_positions(times)) < 0)[0]
+    if len(overlap):
+        print(f"步长1s的离散检查: 最早在t={times[overlap[0]]:.0f}s发现重叠")
@@ -0,0 +1,200 @@
+#舞龙队盘入螺线的公共计算部分，按时间向量化
+#solve_chain与1/version3-latest.py相同(后一节沿前一节与原点连线的反方向摆放)
+#solve_spiral_chain把每个把手都严格放在螺线上，相邻把手距离等于把手间距(与4/version2.py相同的做法)
+#供根目录下的工具脚本调用：from dragon import solve_chain
+import numpy as np
+
+# 定义常量
+p = 0.55  # 螺距(m)
+v_head = 1.0  # 龙头速度(m/s)
+start_turns = 16  # 螺线起始圈数，假设起始在第16圈
+r_0 = start_turns * p  # 螺线起始半径，不给出时按start_turns * p计算
+num_sections = 223  # 总板凳节数
+length_head = 3.41  # 龙头长度(m)
+length_body = 2.20  # 龙身和龙尾长度(m)
+section_lengths = [length_head] + [length_body] * (num_sections - 1)  # 各节板凳长度
+hole_offset = 0.275  # 把手孔中心到板凳端头的距离(m)
+width = 0.30  # 板凳的宽度(m)
+handle_spacings = [length - 2 * hole_offset for length in section_lengths]  # 相邻把手之间的距离
+theta_0 = 2 * np.pi * 16  # 龙头起始极角，从第16圈开始
+newton_tolerance = 1e-12  # 牛顿迭代的收敛精度
+
+# 计算龙头在各时刻的位置，times为一维数组；r_0为None时从第start_turns圈开始
+def head_position(times, p=p, v_head=v_head, r_0=None):
+    if r_0 is None:
+        r_0 = start_turns * p
+    s = v_head * np.asarray(times, dtype=np.float64)  # 龙头走过的路程
+    r = r_0 + p * s / (2 * np.pi)  # 半径随时间变化
+    theta = s / r  # 极角随时间变化
+    return r * np.cos(theta), r * np.sin(theta)
+
+# 计算各时刻所有板凳的位置，返回(len(times), len(section_lengths), 2)
+# 与version3相同：第i节沿前一节把手与原点连线的反方向偏移section_lengths[i]
+# first>1时认为out中前first节已经算好，只从第first节开始往后算
+def solve_chain(times, p=p, v_head=v_head, r_0=None, section_lengths=section_lengths, out=None, first=1):
+    times = np.atleast_1d(times)
+    if out is None:
+        out = np.empty((len(times), len(section_lengths), 2))
+    if first <= 1:
+        x, y = head_position(times, p, v_head, r_0)
+        out[:, 0, 0] = x
+        out[:, 0, 1] = y
+        first = 1
+    else:
+        x, y = out[:, first - 1, 0], out[:, first - 1, 1]
+    for i in range(first, len(section_lengths)):
+        direction = np.arctan2(y, x) + np.pi
+        x = x + section_lengths[i] * np.cos(direction)
+        y = y + section_lengths[i] * np.sin(direction)
+        out[:, i, 0] = x
+        out[:, i, 1] = y
+    return out
+
+# 计算各时刻每节板凳的速度：相邻两时刻的位移除以步长，初始时刻速度为0
+def chain_velocities(positions, dt, out=None):
+    if out is None:
+        out = np.empty(positions.shape[:2])
+    out[0] = 0
+    diff = positions[1:] - positions[:-1]
+    out[1:] = np.sqrt(diff[..., 0] ** 2 + diff[..., 1] ** 2) / dt
+    return out
+
+# 按步长dt计算0到t_total的整条轨迹
+def simulate(t_total, dt=1.0, **params):
+    times = np.arange(int(round(t_total / dt)) + 1) * dt
+    positions = solve_chain(times, **params)
+    return times, positions, chain_velocities(positions, dt)
+
+# 螺线 r = b*theta 从极角0到theta的弧长
+def spiral_arc_length(theta, b):
+    return b / 2 * (theta * np.sqrt(1 + theta ** 2) + np.arcsinh(theta))
+
+# 螺线上极角theta处的位置和对theta的导数
+def spiral_point(theta, b):
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    return (b * theta * cos_t, b * theta * sin_t,
+            b * (cos_t - theta * sin_t), b * (sin_t + theta * cos_t))
+
+# 龙头沿螺线向内走过v_head*t的路程后所在的极角(牛顿迭代)
+def head_spiral_angle(times, p=p, v_head=v_head, theta_0=theta_0):
+    b = p / (2 * np.pi)
+    target = spiral_arc_length(theta_0, b) - v_head * np.asarray(times, dtype=np.float64)
+    theta = np.sqrt(np.maximum(theta_0 ** 2 - 2 * (spiral_arc_length(theta_0, b) - target) / b, 0))  # 初值
+    for _ in range(50):
+        step = (spiral_arc_length(theta, b) - target) / (b * np.sqrt(1 + theta ** 2))
+        theta = theta - step
+        if np.max(np.abs(step), initial=0) < newton_tolerance:
+            break
+    return theta
+
+# 已知前一个把手的极角theta、位置和导数，求螺线上极角更大、距离为length的后一个把手的极角
+def spiral_follower(theta, x, y, dx, dy, length, b):
+    # 弦长不超过弧长，从弧长等于把手间距处开始牛顿迭代，迭代单调逼近最近的解
+    t_next = theta + length / np.hypot(dx, dy)
+    for _ in range(50):
+        xn, yn, dxn, dyn = spiral_point(t_next, b)
+        g = (xn - x) ** 2 + (yn - y) ** 2 - length ** 2
+        if np.max(np.abs(g)) < newton_tolerance:
+            break
+        t_next = t_next - g / (2 * ((xn - x) * dxn + (yn - y) * dyn))
+    return t_next
+
+# 把手严格放在螺线上的模型：第i个把手的极角大于第i-1个，且两者距离等于handle_spacings[i-1]
+# 每节板凳前后各一个把手，把手数N = len(handle_spacings) + 1(最后一节板凳的后把手也算出来)
+# 返回各把手极角(T, N)、位置(T, N, 2)和速度(T, N)，速度由距离约束对时间求导得到
+# 与solve_chain相同，first>1时认为out中前first个把手已经算好，只从第first个把手开始往后算
+def solve_spiral_chain(times, p=p, v_head=v_head, theta_0=theta_0, handle_spacings=handle_spacings, out=None, first=1):
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    b = p / (2 * np.pi)
+    n = len(handle_spacings) + 1  # 把手数比板凳节数多一
+    if out is None:
+        out = (np.empty((len(times), n)), np.empty((len(times), n, 2)), np.empty((len(times), n)))
+    thetas, positions, velocities = out
+
+    if first <= 1:
+        theta = head_spiral_angle(times, p, v_head, theta_0)
+        x, y, dx, dy = spiral_point(theta, b)
+        dtheta = -v_head / np.hypot(dx, dy)  # 龙头极角随时间减小
+        thetas[:, 0], positions[:, 0, 0], positions[:, 0, 1], velocities[:, 0] = theta, x, y, v_head
+        first = 1
+    else:
+        theta = thetas[:, first - 1]
+        x, y, dx, dy = spiral_point(theta, b)
+        dtheta = -velocities[:, first - 1] / np.hypot(dx, dy)  # 盘入时各把手的极角都在减小
+    for i in range(first, n):
+        t_next = spiral_follower(theta, x, y, dx, dy, handle_spacings[i - 1], b)
+        xn, yn, dxn, dyn = spiral_point(t_next, b)
+        # 对 |P(theta_prev)-P(theta)|=L 求导：(P_prev-P)·(P_prev' dtheta_prev - P' dtheta) = 0
+        ex, ey = x - xn, y - yn
+        dtheta = dtheta * (ex * dx + ey * dy) / (ex * dxn + ey * dyn)
+        theta, x, y, dx, dy = t_next, xn, yn, dxn, dyn
+        thetas[:, i], positions[:, i, 0], positions[:, i, 1] = theta, x, y
+        velocities[:, i] = np.hypot(dx, dy) * np.abs(dtheta)
+    return thetas, positions, velocities
+
+# 由把手位置得到各节板凳的矩形：中心、长度方向单位向量、半长，形状为(..., N-1)
+# 4/version2.py中有这个函数和rectangles_overlap的副本(各题目录下的脚本单独运行，不导入根目录的模块)，修改时两处一起改
+def bench_rectangles(positions, section_lengths=section_lengths):
+    front = positions[..., :-1, :]
+    back = positions[..., 1:, :]
+    axis = back - front
+    axis = axis / np.hypot(axis[..., 0], axis[..., 1])[..., None]
+    center = (front + back) / 2
+    half_length = np.broadcast_to(np.asarray(section_lengths[:positions.shape[-2] - 1]) / 2, center.shape[:-1])
+    return center, axis, half_length
+
+# 矩形的四个角，形状为(..., 4, 2)
+def rectangle_corners(center, axis, half_length):
+    normal = np.stack((-axis[..., 1], axis[..., 0]), axis=-1)
+    corners = [center + sa * half_length[..., None] * axis + sn * width / 2 * normal
+               for sa, sn in ((1, 1), (1, -1), (-1, -1), (-1, 1))]
+    return np.stack(corners, axis=-2)
+
+# 两组有向矩形是否重叠(分离轴判定)，各参数的第一维是待判定的矩形对
+def rectangles_overlap(center_a, axis_a, half_a, center_b, axis_b, half_b):
+    d = center_b - center_a
+    normal_a = np.stack((-axis_a[:, 1], axis_a[:, 0]), axis=1)
+    normal_b = np.stack((-axis_b[:, 1], axis_b[:, 0]), axis=1)
+    overlap = np.ones(len(d), dtype=bool)
+    for w in (axis_a, normal_a, axis_b, normal_b):
+        # 两矩形在轴w上投影的半径之和
+        reach = (half_a * np.abs(np.sum(axis_a * w, axis=1)) + width / 2 * np.abs(np.sum(normal_a * w, axis=1))
+                 + half_b * np.abs(np.sum(axis_b * w, axis=1)) + width / 2 * np.abs(np.sum(normal_b * w, axis=1)))
+        overlap &= np.abs(np.sum(d * w, axis=1)) <= reach
+    return overlap
+
+# 点到矩形的有符号距离，点在矩形内时为负
+def point_rectangle_distance(point, center, axis, half_length):
+    d = point - center
+    along = np.abs(np.sum(d * axis, axis=-1)) - half_length
+    across = np.abs(d[..., 1] * axis[..., 0] - d[..., 0] * axis[..., 1]) - width / 2
+    outside = np.hypot(np.maximum(along, 0), np.maximum(across, 0))
+    return np.where((along > 0) | (across > 0), outside, np.maximum(along, across))
+
+# 前num_front节板凳与其余每节板凳之间的间隙(用角点到矩形的距离，两个方向都算)，小于0表示重叠
+# 两个不相交的凸多边形之间的最短距离总在某个角点上取到，所以间隙为正时就是两板凳的真实距离
+# positions为(T, N, 2)，返回(T, num_front, N-1)，自身和相邻板凳为inf
+# start>0时认为out中与前start节板凳之间的间隙已经算好，只重算涉及第start节及以后板凳的部分
+def pair_clearance(positions, num_front=3, section_lengths=section_lengths, out=None, start=0):
+    center, axis, half_length = bench_rectangles(positions, section_lengths)
+    corners = rectangle_corners(center, axis, half_length)
+    num_front = min(num_front, center.shape[1])
+    clearance = out
+    if clearance is None:
+        clearance = np.full((len(positions), num_front, center.shape[1]), np.inf)
+        start = 0
+    for a in range(num_front):
+        others = slice(a + 2 if a >= start else max(a + 2, start), None)
+        c, u, h = center[:, others, None], axis[:, others, None], half_length[:, others, None]
+        # a的角点到其余板凳
+        d1 = point_rectangle_distance(corners[:, a, None], c, u, h)
+        # 其余板凳的角点到a
+        d2 = point_rectangle_distance(corners[:, others], center[:, a, None, None], axis[:, a, None, None],
+                                      half_length[:, a, None, None])
+        clearance[:, a, others] = np.minimum(d1.min(axis=2, initial=np.inf), d2.min(axis=2, initial=np.inf))
+    return clearance
+
+# 前num_front节板凳与其余不相邻板凳之间的最小间隙，返回(T,)
+# 盘入时最先碰撞的是龙头附近的板凳与外一圈的板凳
+def chain_clearance(positions, num_front=3, section_lengths=section_lengths):
+    return pair_clearance(positions, num_front, section_lengths).min(axis=(1, 2), initial=np.inf)
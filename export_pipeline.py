@@ -0,0 +1,113 @@
+#计算和导出流水线：算好的轨迹分块交给后台写线程，主线程同时计算下一块或下一个场景
+#写队列有长度上限，写得慢时主线程会在提交处等待(背压)；写线程里的异常在主线程下一次提交或关闭时抛出
+#用法: python export_pipeline.py [输出目录]
+import os
+import queue
+import sys
+import threading
+import time
+import numpy as np
+
+import dragon
+import guard
+import storage
+
+# 定义常量
+max_pending = 2  # 写队列中最多等待的块数
+chunk_steps = 1000  # 每块的时间步数
+scenarios = [{"p": p} for p in (0.45, 0.50, 0.55, 0.60)]  # 默认导出的场景
+t_total = 300  # 总时间(s)
+dt = 0.1  # 时间步长(s)
+
+class BackgroundWriter:
+    def __init__(self, max_pending=max_pending):
+        self.tasks = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.write_time = 0.0  # 写线程累计用时
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # 写线程：依次执行队列中的写任务，出错后只记录第一个异常并丢弃后面的任务
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            func, args, kwargs = task
+            if self.error is None:
+                start_time = time.perf_counter()
+                try:
+                    func(*args, **kwargs)
+                except Exception as e:
+                    self.error = e
+                self.write_time += time.perf_counter() - start_time
+
+    def raise_error(self):
+        if self.error is not None:
+            raise RuntimeError(f"后台写入失败: {self.error}") from self.error
+
+    # 提交一个写任务，队列满时等待
+    def submit(self, func, *args, **kwargs):
+        self.raise_error()
+        self.tasks.put((func, args, kwargs))
+
+    # 等待所有任务写完并结束写线程
+    def close(self):
+        if self.thread.is_alive():
+            self.tasks.put(None)
+            self.thread.join()
+        self.raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # 主线程已经出错时不再掩盖原来的异常
+            self.tasks.put(None)
+            self.thread.join()
+
+# 分块计算一个场景，逐块返回(times, positions, velocities)；速度用上一块最后一个时刻接上
+def simulate_chunks(t_total, dt, chunk_steps=chunk_steps, **params):
+    num_steps = int(round(t_total / dt)) + 1
+    previous = None
+    solve = guard.guarded_solve_chain(params.get("section_lengths", dragon.section_lengths), params.get("p", dragon.p))
+    for start in range(0, num_steps, chunk_steps):
+        times = np.arange(start, min(start + chunk_steps, num_steps)) * dt
+        positions = solve(times, **params)
+        if previous is None:
+            velocities = dragon.chain_velocities(positions, dt)
+        else:
+            velocities = dragon.chain_velocities(np.concatenate((previous, positions)), dt)[1:]
+        previous = positions[-1:]
+        yield times, positions, velocities
+
+# 运行所有场景，计算和写盘重叠进行
+def run_pipeline(scenarios, output_dir, precision=storage.default_precision):
+    os.makedirs(output_dir, exist_ok=True)
+    compute_time = 0.0
+    with BackgroundWriter() as writer:
+        for k, params in enumerate(scenarios):
+            chunks = simulate_chunks(t_total, dt, **params)
+            j = 0
+            while True:
+                start_time = time.perf_counter()
+                chunk = next(chunks, None)
+                compute_time += time.perf_counter() - start_time
+                if chunk is None:
+                    break
+                file_path = os.path.join(output_dir, f"scenario{k}_chunk{j:04d}.npz")
+                writer.submit(storage.save_trajectory, file_path, *chunk, precision)
+                j += 1
+    return compute_time, writer.write_time
+
+
+if __name__ == '__main__':
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else 'exports'
+    start_time = time.perf_counter()
+    compute_time, write_time = run_pipeline(scenarios, output_dir)
+    wall_time = time.perf_counter() - start_time
+    print(f"{len(scenarios)}个场景: 计算{compute_time:.2f}秒，写盘{write_time:.2f}秒，"
+          f"总用时{wall_time:.2f}秒(顺序执行约{compute_time + write_time:.2f}秒)")
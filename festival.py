@@ -0,0 +1,113 @@
+#多支舞龙队同场：每支队伍有自己的板凳节数、螺距、盘入中心、朝向和出发时间，一次求解全部队伍
+#位置按(T, M, N, 2)存放，M为队伍数，N为最多的把手数，节数较少的队伍后面补nan
+#碰撞检查把所有队伍的板凳放进同一个均匀网格粗筛，只比较相邻格子里的板凳，再用分离轴细判
+#同一队伍中相邻两节在把手处铰接，不算碰撞
+#用法: python festival.py
+import time
+import numpy as np
+
+import dragon
+
+# 定义常量
+t_total = 300  # 总时间(s)
+dt = 1.0  # 时间步长(s)
+# 各队伍的参数，没有给出的参数用dragon.py中的默认值
+# center为盘入中心，rotation为整条螺线绕中心旋转的角度，start为出发时刻(之前停在起点)，turns为起始圈数
+teams = [
+    {"num_sections": 223, "p": 0.55, "center": (0.0, 0.0), "rotation": 0.0, "start": 0.0},
+    {"num_sections": 120, "p": 0.60, "center": (26.0, 0.0), "rotation": np.pi, "start": 20.0},
+    {"num_sections": 160, "p": 0.50, "center": (12.0, 21.0), "rotation": np.pi / 2, "start": 40.0, "turns": 14},
+]
+
+# 补全默认值，得到每支队伍的板凳长度和把手间距
+def team_params(team):
+    num_sections = team.get("num_sections", dragon.num_sections)
+    lengths = [team.get("length_head", dragon.length_head)] + [team.get("length_body", dragon.length_body)] * (num_sections - 1)
+    return {"p": team.get("p", dragon.p), "v_head": team.get("v_head", dragon.v_head),
+            "theta_0": 2 * np.pi * team.get("turns", 16), "center": np.asarray(team.get("center", (0.0, 0.0))),
+            "rotation": team.get("rotation", 0.0), "start": team.get("start", 0.0),
+            "section_lengths": lengths, "handle_spacings": [length - 2 * dragon.hole_offset for length in lengths]}
+
+# 求解全部队伍，返回位置(T, M, N, 2)、速度(T, M, N)和板凳长度(M, N-1)，不足的部分为nan
+# 每支队伍的把手数比板凳节数多一
+def solve_teams(times, teams=teams):
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    params = [team_params(team) for team in teams]
+    n = max(len(param["section_lengths"]) for param in params) + 1
+    positions = np.full((len(times), len(params), n, 2), np.nan)
+    velocities = np.full((len(times), len(params), n), np.nan)
+    lengths = np.full((len(params), n - 1), np.nan)
+    for m, param in enumerate(params):
+        k = len(param["section_lengths"]) + 1
+        local = np.maximum(times - param["start"], 0)
+        _, xy, speed = dragon.solve_spiral_chain(local, param["p"], param["v_head"], param["theta_0"],
+                                                 param["handle_spacings"])
+        cos_r, sin_r = np.cos(param["rotation"]), np.sin(param["rotation"])
+        positions[:, m, :k, 0] = param["center"][0] + cos_r * xy[..., 0] - sin_r * xy[..., 1]
+        positions[:, m, :k, 1] = param["center"][1] + sin_r * xy[..., 0] + cos_r * xy[..., 1]
+        velocities[:, m, :k] = np.where((times >= param["start"])[:, None], speed, 0)
+        lengths[m, :k - 1] = param["section_lengths"][:k - 1]
+    return positions, velocities, lengths
+
+# 检查所有板凳之间是否重叠(同一队伍内和不同队伍之间)
+# 粗筛：把各时刻全部板凳的中心放进均匀网格，网格边长为最大外接圆直径，只比较相同和相邻格子里的板凳
+# 细判：外接圆相交的板凳对再做有向矩形的分离轴判定
+# 返回发生碰撞的(时刻下标, 队伍a, 板凳a, 队伍b, 板凳b)，以及粗筛后留下的板凳对数
+def check_collisions(positions, lengths):
+    center, axis, half_length = dragon.bench_rectangles(positions, lengths)
+    step, team, bench = np.nonzero(~np.isnan(center[..., 0]) & ~np.isnan(half_length))
+    cx = center[step, team, bench]
+    radius = np.hypot(half_length[step, team, bench], dragon.width / 2)  # 外接圆半径
+    cell = 2 * radius.max()
+    origin = cx.min(axis=0)
+    ix = ((cx[:, 0] - origin[0]) // cell).astype(np.int64)
+    iy = ((cx[:, 1] - origin[1]) // cell).astype(np.int64)
+    nx, ny = ix.max() + 3, iy.max() + 3
+    key = (step * nx + ix + 1) * ny + iy + 1  # 格子编号前后各留一格，相邻格子不会越界
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    first, second = [], []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            neighbour = key + ox * ny + oy
+            start = np.searchsorted(sorted_key, neighbour, side='left')
+            count = np.searchsorted(sorted_key, neighbour, side='right') - start
+            # 把每个板凳对应的[start, stop)展开成板凳对
+            a = np.repeat(np.arange(len(key)), count)
+            offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+            first.append(a)
+            second.append(order[np.repeat(start, count) + offset])
+    a = np.concatenate(first)
+    b = np.concatenate(second)
+    # 每对只保留一次；同一队伍去掉自身和相邻的板凳
+    keep = np.where(team[a] == team[b], bench[a] + 1 < bench[b], team[a] < team[b])
+    a, b = a[keep], b[keep]
+    candidates = len(a)
+    close = np.hypot(*(cx[a] - cx[b]).T) <= radius[a] + radius[b]
+    a, b = a[close], b[close]
+    s, ta, ba, tb, bb = step[a], team[a], bench[a], team[b], bench[b]
+    hit = dragon.rectangles_overlap(center[s, ta, ba], axis[s, ta, ba], half_length[s, ta, ba],
+                                    center[s, tb, bb], axis[s, tb, bb], half_length[s, tb, bb])
+    return np.column_stack((s[hit], ta[hit], ba[hit], tb[hit], bb[hit])), candidates
+
+
+if __name__ == '__main__':
+    times = np.arange(int(round(t_total / dt)) + 1) * dt
+    start_time = time.perf_counter()
+    positions, velocities, lengths = solve_teams(times)
+    solve_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    collisions, candidates = check_collisions(positions, lengths)
+    check_time = time.perf_counter() - start_time
+    num_benches = int(np.sum(~np.isnan(lengths)))
+    print(f"{len(teams)}支队伍共{num_benches}节板凳，{len(times)}个时刻: 求解{solve_time:.2f}秒，"
+          f"碰撞检查{check_time:.2f}秒(粗筛后{candidates}对，两两比较需{len(times) * num_benches * (num_benches - 1) // 2}对)")
+    if len(collisions) == 0:
+        print("没有发生碰撞")
+    # 每对队伍最早的碰撞
+    for a in range(len(teams)):
+        for b in range(a, len(teams)):
+            rows = collisions[(collisions[:, 1] == a) & (collisions[:, 3] == b)]
+            if len(rows):
+                s, _, ba, _, bb = rows[np.argmin(rows[:, 0])]
+                print(f"队伍{a + 1}第{ba + 1}节与队伍{b + 1}第{bb + 1}节最早在t={times[s]:.1f}s重叠")
@@ -0,0 +1,144 @@
+#求解结果的在线检查：相邻把手的距离是否等于把手间距、把手是否在路径上
+#路径的残差由调用者给出：盘入螺线用spiral_path，其他路径(如4/version2.py的调头路径)传入自己的函数
+#只检查按比例抽取的部分时刻(最多每个时刻都查)，每个抽查时刻只取一次坐标，各项残差在连续数组上原地计算，开销只占求解的很小一部分
+#超过容差时抛出异常或打印警告；batch_runner.py、query_server.py、export_pipeline.py的求解都经过检查
+#这些工具沿用version3的做法(dragon.solve_chain，沿半径方向偏移)，它本身不满足这两个条件，检查时只打印偏差(on_violation='log')
+#用法: python guard.py
+import importlib.util
+import os
+import sys
+import time
+import numpy as np
+
+import dragon
+
+# 定义常量
+sample_rate = 0.1  # 抽查的时刻比例，1为每个时刻都查
+spacing_tolerance = 1e-8  # 相邻把手距离的容差(m)
+path_tolerance = 1e-8  # 把手到路径的距离容差(m)
+
+class InvariantError(ValueError):
+    pass
+
+# 按比例均匀抽取时刻下标，总包含最后一个时刻；rate不大于0或没有时刻时不抽取
+def sample_steps(num_steps, rate=sample_rate):
+    if num_steps == 0 or rate <= 0:
+        return np.empty(0, dtype=np.intp)
+    stride = max(1, int(round(1 / rate)))
+    steps = np.arange(0, num_steps, stride)
+    if steps[-1] != num_steps - 1:
+        steps = np.append(steps, num_steps - 1)
+    return steps
+
+# 相邻把手距离与把手间距之差，x, y为抽查时刻的把手坐标(S, N)，返回(S, N-1)
+def spacing_residual(x, y, handle_spacings):
+    dx = x[:, 1:] - x[:, :-1]
+    dy = y[:, 1:] - y[:, :-1]
+    dx *= dx
+    dy *= dy
+    dx += dy
+    np.sqrt(dx, out=dx)
+    dx -= np.asarray(handle_spacings[:x.shape[1] - 1])
+    return np.abs(dx, out=dx)
+
+# 把手到螺线 r = b*theta 的径向距离(取极角相差2π整数倍中最近的一圈)，返回(S, N)
+# 螺线中心对称的盘出螺线(r = -b*theta)用sign=-1
+def spiral_residual(x, y, b, sign=1):
+    r = x * x
+    r += y * y
+    np.sqrt(r, out=r)
+    # 极径对应的圈数与极角对应的圈数之差，取到最近整数的距离
+    turns = r / (2 * np.pi * b)
+    turns -= np.arctan2(sign * y, sign * x) / (2 * np.pi)
+    turns -= np.round(turns)
+    np.abs(turns, out=turns)
+    turns *= 2 * np.pi * b
+    return turns
+
+# 螺线路径的残差函数
+def spiral_path(b, sign=1):
+    return lambda x, y: spiral_residual(x, y, b, sign)
+
+# 4/version2.py调头路径的残差：到路径各段所在曲线(盘入螺线、两段圆弧所在的圆、盘出螺线)的最小距离
+# geometry为4/version2.py中build_turn_geometry的返回值
+def turn_path(geometry):
+    b = geometry["b"]
+    def residual(x, y):
+        pieces = [spiral_residual(x, y, b), spiral_residual(x, y, b, -1)]
+        for k in (1, 2):
+            distance = np.sqrt((x - geometry["cx"][k]) ** 2 + (y - geometry["cy"][k]) ** 2)
+            pieces.append(np.abs(distance - geometry["rho0"][k]))
+        return np.min(pieces, axis=0)
+    return residual
+
+# 检查一组结果，返回各项残差的最大值；超过容差时按on_violation抛出异常('raise')或打印警告('log')
+# path_residual为抽查时刻的把手坐标x, y(S, N)到路径残差(S, N)的函数，为None时只检查相邻把手距离
+def check_chain(positions, handle_spacings, path_residual=None, rate=sample_rate, on_violation='raise', label=''):
+    steps = sample_steps(len(positions), rate)
+    x, y = positions[steps, :, 0], positions[steps, :, 1]  # 取出后是连续数组
+    spacing = spacing_residual(x, y, handle_spacings)
+    path = path_residual(x, y) if path_residual is not None else np.zeros(x.shape)
+    report = {"spacing": spacing.max(initial=0), "path": path.max(initial=0), "steps": len(steps)}
+    problems = []
+    for name, residual, tolerance in (("相邻把手距离", spacing, spacing_tolerance), ("把手到路径距离", path, path_tolerance)):
+        if residual.max(initial=0) > tolerance:
+            k, i = np.unravel_index(np.argmax(residual), residual.shape)
+            problems.append(f"{name}偏差{residual[k, i]:.3e}m超过容差{tolerance:g}"
+                            f"(第{steps[k]}个时刻第{i + 1}个把手，共{np.count_nonzero(residual > tolerance)}处)")
+    if problems:
+        message = f"{label}结果检查未通过: " + "；".join(problems)
+        if on_violation == 'raise':
+            raise InvariantError(message)
+        print(message, file=sys.stderr)
+    return report
+
+# 包装求解函数：返回的把手位置经过检查后再交给调用者
+def guarded(solve, handle_spacings, path_residual=None, rate=sample_rate, on_violation='raise'):
+    def run(*args, **kwargs):
+        result = solve(*args, **kwargs)
+        positions = result[1] if isinstance(result, tuple) else result
+        check_chain(positions, handle_spacings, path_residual, rate, on_violation, getattr(solve, '__name__', '') + ' ')
+        return result
+    return run
+
+# version3做法(dragon.solve_chain)按真实条件检查：相邻把手距离等于板凳长度减去两端孔距，把手在螺距为p的螺线上
+# version3的结果不满足这两个条件，默认只打印偏差，不中断求解
+def guarded_solve_chain(section_lengths=dragon.section_lengths, p=dragon.p, rate=sample_rate, on_violation='log'):
+    handle_spacings = [length - 2 * dragon.hole_offset for length in section_lengths]
+    return guarded(dragon.solve_chain, handle_spacings, spiral_path(p / (2 * np.pi)), rate, on_violation)
+
+
+if __name__ == '__main__':
+    b = dragon.p / (2 * np.pi)
+    times = np.arange(0, 3001) * 0.1
+    for rate in (sample_rate, 1.0):
+        start_time = time.perf_counter()
+        _, positions, _ = dragon.solve_spiral_chain(times)
+        solve_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        report = check_chain(positions, dragon.handle_spacings, spiral_path(b), rate)
+        check_time = time.perf_counter() - start_time
+        print(f"solve_spiral_chain 抽查比例{rate}: 检查{report['steps']}个时刻，相邻把手距离偏差{report['spacing']:.2e}m，"
+              f"到螺线距离偏差{report['path']:.2e}m，检查用时占求解的{check_time / solve_time:.1%}")
+    # 1/version3-latest.py的做法(沿半径方向偏移)：不满足真实条件，只打印偏差
+    start_time = time.perf_counter()
+    positions = dragon.solve_chain(times)
+    solve_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    report = check_chain(positions, dragon.handle_spacings, spiral_path(b), on_violation='log', label='solve_chain ')
+    check_time = time.perf_counter() - start_time
+    print(f"solve_chain 抽查比例{sample_rate}: 相邻把手距离偏差{report['spacing']:.2e}m，到螺线距离偏差{report['path']:.2e}m，"
+          f"检查用时占求解的{check_time / solve_time:.1%}")
+    # 4/version2.py的调头过程(盘入、两段圆弧、盘出)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '4', 'version2.py')
+    spec = importlib.util.spec_from_file_location('turn_model', path)
+    turn = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(turn)
+    geometry = turn.build_turn_geometry()
+    positions, _, _ = turn.simulate_timeline(np.arange(-1000, 1001) * 0.1, geometry)
+    report = check_chain(positions, turn.handle_spacings, turn_path(geometry), 1.0)
+    print(f"4/version2.py: 相邻把手距离偏差{report['spacing']:.2e}m，到调头路径距离偏差{report['path']:.2e}m")
+    # 把一个把手挪开1e-6m，检查不通过
+    _, positions, _ = dragon.solve_spiral_chain(times)
+    positions[1300, 100] += 1e-6
+    check_chain(positions, dragon.handle_spacings, spiral_path(b), 1.0, on_violation='log', label='挪动了一个把手的')
@@ -0,0 +1,128 @@
+#只改动后面几节板凳时的增量重算：第i节板凳的长度变了，前i个把手(0..i)的位置和速度都不变，只需重算i+1以后的把手
+#每个场景的结果按时间分块保存(极角、位置、速度、前几节板凳与其余板凳的间隙)，
+#修改板凳长度时每块只重算变化之后的把手，间隙也只重算涉及变化之后板凳的部分
+#用法: python incremental.py
+import time
+import numpy as np
+
+import dragon
+
+# 定义常量
+block_steps = 1000  # 每块的时间步数
+num_front = 3  # 检查间隙时的前几节板凳
+
+# 两个长度列表从第几个开始不同(完全相同时返回长度)
+def first_difference(a, b):
+    k = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        k += 1
+    return k
+
+class IncrementalChain:
+    def __init__(self, times, section_lengths=dragon.section_lengths, p=dragon.p, v_head=dragon.v_head,
+                 theta_0=dragon.theta_0, block_steps=block_steps):
+        self.p, self.v_head, self.theta_0 = p, v_head, theta_0
+        self.section_lengths = [float(length) for length in section_lengths]
+        times = np.asarray(times, dtype=np.float64)
+        self.blocks = [{"times": times[k:k + block_steps]} for k in range(0, len(times), block_steps)]
+        self.recomputed = 0  # 累计重算的把手-时刻数
+        for block in self.blocks:
+            self.solve_block(block, 0)
+
+    def handle_spacings(self):
+        return [length - 2 * dragon.hole_offset for length in self.section_lengths]
+
+    # 从第first个把手开始重算一块，间隙只重算涉及第first-1节及以后板凳的部分
+    # 把手数比板凳节数多一：第i节板凳在第i和第i+1个把手之间
+    def solve_block(self, block, first):
+        n = len(self.section_lengths) + 1
+        if first == 0:
+            block["out"] = (np.empty((len(block["times"]), n)), np.empty((len(block["times"]), n, 2)),
+                            np.empty((len(block["times"]), n)))
+            block["clearance"] = None
+        dragon.solve_spiral_chain(block["times"], self.p, self.v_head, self.theta_0, self.handle_spacings(),
+                                  out=block["out"], first=max(first, 1))
+        block["clearance"] = dragon.pair_clearance(block["out"][1], num_front, self.section_lengths,
+                                                   out=block["clearance"], start=max(first - 1, 0))
+        self.recomputed += len(block["times"]) * max(n - first, 0)
+
+    # 换成新的板凳长度，返回从第几个把手开始重算
+    def update(self, section_lengths):
+        section_lengths = [float(length) for length in section_lengths]
+        changed = first_difference(self.section_lengths, section_lengths)
+        if changed == len(section_lengths) == len(self.section_lengths):
+            return len(section_lengths) + 1
+        first = changed + 1  # 第changed节板凳后端的把手是第一个变化的把手
+        resized = len(section_lengths) != len(self.section_lengths)
+        self.section_lengths = section_lengths
+        for block in self.blocks:
+            if resized:
+                start = self.resize_block(block, first)
+            else:
+                self.solve_block(block, first)
+                start = first
+        return start
+
+    # 节数变了：重新分配数组，保留不变的前缀，再从第keep个把手开始重算，返回keep
+    # 在后面加板凳时原来只有old_len+1个把手，从第old_len+1个把手(第一个新把手)开始算
+    def resize_block(self, block, first):
+        n = len(self.section_lengths) + 1
+        old_out, old_clearance = block["out"], block["clearance"]
+        keep = min(first, n, old_out[0].shape[1])
+        block["out"] = tuple(np.empty((len(block["times"]), n) + old.shape[2:]) for old in old_out)
+        for new, old in zip(block["out"], old_out):
+            new[:, :keep] = old[:, :keep]
+        block["clearance"] = np.full((len(block["times"]), min(num_front, n - 1), n - 1), np.inf)
+        rows = min(block["clearance"].shape[1], old_clearance.shape[1])
+        block["clearance"][:, :rows, :keep - 1] = old_clearance[:, :rows, :keep - 1]
+        self.solve_block(block, keep)
+        return keep
+
+    # 拼接全部块的结果：极角、位置、速度和间隙
+    def result(self):
+        thetas, positions, velocities = (np.concatenate([block["out"][k] for block in self.blocks]) for k in range(3))
+        clearance = np.concatenate([block["clearance"] for block in self.blocks])
+        return thetas, positions, velocities, clearance
+
+
+if __name__ == '__main__':
+    times = np.arange(0, 3001) * 0.1
+    start_time = time.perf_counter()
+    chain = IncrementalChain(times)
+    print(f"完整求解{len(times)}个时刻 x {len(chain.section_lengths) + 1}个把手: {time.perf_counter() - start_time:.3f}秒")
+    for label, index, length in (("换最后一节板凳", 222, 3.0), ("换第221节板凳", 220, 2.25),
+                                 ("换第101节板凳", 100, 2.18), ("换第2节板凳", 1, 2.21)):
+        lengths = list(chain.section_lengths)
+        lengths[index] = length
+        _, previous_positions, _, _ = chain.result()
+        chain.recomputed = 0
+        start_time = time.perf_counter()
+        first = chain.update(lengths)
+        elapsed = time.perf_counter() - start_time
+        # 与从头求解比较，并给出结果实际变化了多少(改了板凳却不变说明没有重算)
+        _, positions, velocities, clearance = chain.result()
+        moved = np.abs(positions - previous_positions).max()
+        _, exact_positions, exact_velocities = dragon.solve_spiral_chain(
+            times, handle_spacings=[length - 2 * dragon.hole_offset for length in lengths])
+        exact_clearance = dragon.pair_clearance(exact_positions, num_front, lengths)
+        finite = np.isfinite(exact_clearance)
+        print(f"{label}: 从第{first + 1}个把手开始重算{chain.recomputed}个把手-时刻，用时{elapsed:.3f}秒，"
+              f"把手位置最多变化{moved:.3f}m，与从头求解之差: 位置{np.abs(positions - exact_positions).max():.1e}m，"
+              f"速度{np.abs(velocities - exact_velocities).max():.1e}m/s，间隙{np.abs(clearance[finite] - exact_clearance[finite]).max():.1e}m")
+    # 去掉最后10节板凳，再在后面加20节
+    for label, lengths in (("去掉最后10节板凳", chain.section_lengths[:-10]),
+                           ("在后面加20节板凳", chain.section_lengths[:-10] + [dragon.length_body] * 20)):
+        start_time = time.perf_counter()
+        first = chain.update(lengths)
+        elapsed = time.perf_counter() - start_time
+        _, positions, velocities, clearance = chain.result()
+        _, exact_positions, exact_velocities = dragon.solve_spiral_chain(
+            times, handle_spacings=[length - 2 * dragon.hole_offset for length in lengths])
+        exact_clearance = dragon.pair_clearance(exact_positions, num_front, lengths)
+        finite = np.isfinite(exact_clearance)
+        start = f"从第{first + 1}个把手开始重算" if first <= len(lengths) else "不需要重算把手"
+        print(f"{label}: {start}，用时{elapsed:.3f}秒，与从头求解之差: "
+              f"位置{np.abs(positions - exact_positions).max():.1e}m，速度{np.abs(velocities - exact_velocities).max():.1e}m/s，"
+              f"间隙{np.abs(clearance[finite] - exact_clearance[finite]).max():.1e}m")
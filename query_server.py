@@ -0,0 +1,173 @@
+#本地查询服务：回答"某节把手在某时刻的位置和速度"，不用再重跑整个题目脚本、打开Excel
+#按参数给出的场景第一次被查询时用dragon.solve_chain求出0到t_total每dt秒的整条轨迹，常驻内存(LRU缓存最近的场景)
+#落在这些时刻上的查询直接查表；其余时刻只对这些时刻按需求解(连同前dt秒一起求一次)，结果都是精确值
+#速度与version3相同，是该时刻与前dt秒位置之差除以dt
+#已保存的关键帧文件(trajectory.py)常驻内存，按样条重建，返回文件中记录的误差检查结果(只是检查点上的误差，不是上界)
+#用法: python query_server.py [端口]
+#请求: POST /query  {"scenario": {"p": 0.55, "t_total": 300}, "queries": [[101, 237.4], [1, 10]]}
+#      也可以用 {"file": "result1_keyframes.npz"} 指定已保存的关键帧文件
+#返回: {"results": [{"section": 101, "time": 237.4, "x": ..., "y": ..., "velocity": ...}], "source": "exact", "solved_times": 0}
+#      solved_times为不在常驻轨迹上、按需求解的时刻数
+#      关键帧文件返回 "source": "keyframes" 和 "keyframe_check": {"max_error": ..., "checked": ..., "tolerance_met": ...}
+import json
+import sys
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+import numpy as np
+
+import dragon
+import guard
+import trajectory
+
+# 定义常量
+host = '127.0.0.1'  # 只监听本机
+port = 8765  # 默认端口
+cache_size = 16  # LRU缓存的场景数
+default_dt = 0.1  # 常驻轨迹的时间步长(s)
+grid_tolerance = 1e-9  # 查询时刻与常驻轨迹时刻之差小于该值时直接查表(s)
+scenario_params = ('p', 'v_head', 'r_0', 't_total', 'dt')  # 场景中允许的参数
+
+# 求解一个场景0到t_total每dt秒的整条轨迹，结果留在LRU缓存中
+@lru_cache(maxsize=cache_size)
+def warm_scenario(key):
+    params = dict(key)
+    t_total = params.pop('t_total', 300)
+    dt = params.pop('dt', default_dt)
+    times = np.arange(int(np.floor(t_total / dt + grid_tolerance)) + 1) * dt
+    solve = guard.guarded_solve_chain(p=params.get('p', dragon.p))
+    positions = solve(times, **params)
+    return {"params": params, "t_total": t_total, "dt": dt, "positions": positions,
+            "velocities": dragon.chain_velocities(positions, dt)}
+
+# 求出一个场景在时刻times的位置(T, N, 2)和速度(T, N)，以及按需求解的时刻数
+def solve_scenario(key, times):
+    scenario = warm_scenario(key)
+    params, dt = scenario["params"], scenario["dt"]
+    times = np.asarray(times, dtype=np.float64)
+    if np.any((times < 0) | (times > scenario["t_total"])):
+        raise ValueError(f"查询时刻超出场景范围[0, {scenario['t_total']}]")
+    steps = np.minimum(np.rint(times / dt).astype(np.intp), len(scenario["positions"]) - 1)
+    positions = scenario["positions"][steps]
+    velocities = scenario["velocities"][steps]
+    off_grid = np.flatnonzero(np.abs(steps * dt - times) > grid_tolerance)
+    if len(off_grid):
+        # 该时刻和前dt秒(不足dt时为0时刻)一起求解一次
+        t = times[off_grid]
+        previous_times = np.maximum(t - dt, 0)
+        solve = guard.guarded_solve_chain(p=params.get('p', dragon.p))
+        solved = solve(np.concatenate((t, previous_times)), **params)
+        current, previous = solved[:len(t)], solved[len(t):]
+        diff = current - previous
+        step = np.where(t > 0, t - previous_times, 1.0)
+        positions[off_grid] = current
+        velocities[off_grid] = np.hypot(diff[..., 0], diff[..., 1]) / step[:, None]
+    return positions, velocities, len(off_grid)
+
+# 读取已保存的关键帧文件，同样放在LRU缓存中
+@lru_cache(maxsize=cache_size)
+def load_scenario_file(file_path):
+    return trajectory.load_keyframes(file_path)
+
+# 检查场景参数并整理成可以作为缓存键的元组
+def scenario_key(scenario):
+    unknown = set(scenario) - set(scenario_params)
+    if unknown:
+        raise ValueError(f"未知的场景参数: {sorted(unknown)}")
+    params = {k: float(v) for k, v in scenario.items()}
+    if not params.get('dt', default_dt) > 0:
+        raise ValueError("dt应大于0")
+    if not params.get('t_total', 0) >= 0:
+        raise ValueError("t_total应不小于0")
+    return tuple(sorted(params.items()))
+
+# 求出请求的各时刻的位置和速度：给出file时从关键帧重建，否则按scenario在这些时刻直接求解
+def lookup(request, times):
+    if 'file' in request:
+        keyframes = load_scenario_file(request['file'])
+        positions, velocities = trajectory.reconstruct(keyframes, times)
+        return positions, velocities, {"source": "keyframes", "keyframe_check": {
+            "max_error": keyframes['max_error'], "checked": keyframes['checked'],
+            "tolerance_met": keyframes['tolerance_met']}}
+    positions, velocities, solved = solve_scenario(scenario_key(request.get('scenario', {})), times)
+    return positions, velocities, {"source": "exact", "solved_times": solved}
+
+# 批量回答(把手编号, 时刻)查询，把手编号从1开始，与Excel中的section一致
+def answer_queries(request, queries):
+    queries = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+    sections = queries[:, 0].astype(int)
+    # 相同时刻只求解(重建)一次
+    times, inverse = np.unique(queries[:, 1], return_inverse=True)
+    positions, velocities, info = lookup(request, times)
+    num_sections = positions.shape[1]
+    if np.any((sections < 1) | (sections > num_sections)):
+        raise ValueError(f"把手编号应在1到{num_sections}之间")
+    x = positions[inverse, sections - 1, 0]
+    y = positions[inverse, sections - 1, 1]
+    v = velocities[inverse, sections - 1]
+    results = [{"section": int(s), "time": float(t), "x": float(a), "y": float(b), "velocity": float(c)}
+               for s, t, a, b, c in zip(sections, queries[:, 1], x, y, v)]
+    return results, info
+
+class QueryHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != '/query':
+            self.send_json(404, {"error": f"未知路径: {self.path}"})
+            return
+        start_time = time.perf_counter()
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            results, info = answer_queries(request, request.get('queries', []))
+        except guard.InvariantError as e:
+            self.send_json(500, {"error": str(e)})
+            return
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        self.send_json(200, dict(info, results=results, elapsed=time.perf_counter() - start_time))
+
+    def do_GET(self):
+        if self.path != '/scenarios':
+            self.send_json(404, {"error": f"未知路径: {self.path}"})
+            return
+        self.send_json(200, {
+            "solved": warm_scenario.cache_info()._asdict(),
+            "files": load_scenario_file.cache_info()._asdict(),
+        })
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # 不在终端逐条打印请求
+    def log_message(self, format, *args):
+        pass
+
+# 客户端：向本地服务发送一批查询
+def query(queries, scenario=None, file=None, url=f'http://{host}:{port}/query'):
+    request = {"queries": queries}
+    if file is not None:
+        request["file"] = file
+    else:
+        request["scenario"] = scenario or {}
+    data = json.dumps(request).encode('utf-8')
+    with urlopen(Request(url, data=data, headers={'Content-Type': 'application/json'})) as response:
+        return json.loads(response.read())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        port = int(sys.argv[1])
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"查询服务已启动: http://{host}:{port}/query")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
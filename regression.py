@@ -0,0 +1,139 @@
+#结果回归比较：检查新的求解结果是否还能复现提交在仓库里的result1.xlsx、1/result1.xlsx、result4.xlsx
+#Excel只在第一次读取时解析，之后按文件内容的哈希缓存成按列存放的npz，比较全部向量化
+#任一边有对不上的行(时刻或板凳编号只在一边出现)时不通过，加--allow-partial时只比较共有的部分
+#用法: python regression.py 基准文件 新结果(.xlsx或storage.py保存的.npz) [容差] [--allow-partial]
+import hashlib
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+import storage
+
+# 定义常量
+cache_dir = '.golden_cache'  # 缓存目录
+default_tolerance = 1e-6  # 默认容差，结果只保留6位小数
+key_columns = ('time', 'section')  # 按时刻和板凳编号对齐
+report_count = 5  # 报告偏差最大的几节板凳和几个时刻
+
+# 读取Excel并转成按列存放的数组，同一文件内容只解析一次
+def load_columns(file_path):
+    with open(file_path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"{os.path.basename(file_path)}-{digest}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            return {name: data[name] for name in data.files}
+    table = pd.read_excel(file_path)
+    columns = {name: table[name].to_numpy(dtype=np.float64) for name in table.columns}
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(cache_path, **columns)
+    return columns
+
+# 把storage.py保存的轨迹转成与Excel相同的列
+def trajectory_columns(file_path):
+    times, positions, velocities, _ = storage.load_trajectory(file_path)
+    num_sections = positions.shape[1]
+    return {
+        "time": np.repeat(times, num_sections),
+        "section": np.tile(np.arange(1, num_sections + 1, dtype=np.float64), len(times)),
+        "x_position": positions[..., 0].ravel(),
+        "y_position": positions[..., 1].ravel(),
+        "velocity": velocities.ravel(),
+    }
+
+def read_result(file_path):
+    if file_path.endswith('.npz'):
+        return trajectory_columns(file_path)
+    return load_columns(file_path)
+
+# 把列排成(时刻, 板凳)的网格，缺失的位置为nan
+def to_grid(columns, times, sections):
+    t_index = np.searchsorted(times, columns['time'])
+    s_index = np.searchsorted(sections, columns['section'])
+    found = (t_index < len(times)) & (s_index < len(sections))
+    found[found] &= (times[t_index[found]] == columns['time'][found]) & (sections[s_index[found]] == columns['section'][found])
+    grids = {}
+    for name, values in columns.items():
+        if name in key_columns:
+            continue
+        grid = np.full((len(times), len(sections)), np.nan)
+        grid[t_index[found], s_index[found]] = values[found]
+        grids[name] = grid
+    return grids
+
+# 比较两个结果，返回各列的最大偏差以及按板凳、按时刻的最大偏差
+# 没有共同的(时刻, 板凳)、没有共同的数据列，或者(allow_partial为False时)有未对齐的行，都算不通过
+def compare(golden, candidate, tolerance=default_tolerance, allow_partial=False):
+    # 时刻保留到1e-9，避免浮点步长累积的舍入影响对齐
+    for columns in (golden, candidate):
+        columns['time'] = np.round(columns['time'], 9)
+    times = np.intersect1d(golden['time'], candidate['time'])
+    sections = np.intersect1d(golden['section'], candidate['section'])
+    expected = to_grid(golden, times, sections)
+    actual = to_grid(candidate, times, sections)
+    report = {"times": times, "sections": sections, "columns": {}, "passed": True, "problems": [],
+              "unmatched": (len(golden['time']) - len(times) * len(sections),
+                            len(candidate['time']) - len(times) * len(sections))}
+    if len(times) == 0 or len(sections) == 0:
+        report["passed"] = False
+        report["problems"].append("两个结果没有共同的(时刻, 板凳)")
+        return report
+    if any(report["unmatched"]) and not allow_partial:
+        report["passed"] = False
+        report["problems"].append("有未对齐的行(加--allow-partial只比较共有的部分)")
+    for name in expected:
+        if name not in actual:
+            continue
+        deviation = np.abs(actual[name] - expected[name])
+        deviation[np.isnan(deviation)] = np.inf  # 一边有值一边缺失按不通过处理
+        per_section = deviation.max(axis=0)
+        per_time = deviation.max(axis=1)
+        report["columns"][name] = {
+            "max": float(deviation.max(initial=0.0)),
+            "per_section": per_section,
+            "per_time": per_time,
+            "failed": int(np.count_nonzero(deviation > tolerance)),
+        }
+        report["passed"] &= report["columns"][name]["failed"] == 0
+    if not report["columns"]:
+        report["passed"] = False
+        report["problems"].append("两个结果没有共同的数据列")
+    return report
+
+# 打印比较结果
+def print_report(report, tolerance=default_tolerance):
+    print(f"对齐了{len(report['times'])}个时刻 x {len(report['sections'])}节板凳，"
+          f"未对齐的行数: 基准{report['unmatched'][0]}，新结果{report['unmatched'][1]}")
+    for problem in report["problems"]:
+        print(f"不通过: {problem}")
+    for name, result in report["columns"].items():
+        status = "通过" if result["failed"] == 0 else f"{result['failed']}处超出容差"
+        print(f"{name}: 最大偏差{result['max']:.3e} ({status})")
+        if result["failed"] == 0:
+            continue
+        worst_sections = np.argsort(result["per_section"])[::-1][:report_count]
+        worst_times = np.argsort(result["per_time"])[::-1][:report_count]
+        print("  偏差最大的板凳: " + ", ".join(
+            f"第{int(report['sections'][k])}节({result['per_section'][k]:.2e})" for k in worst_sections
+            if result["per_section"][k] > tolerance))
+        print("  偏差最大的时刻: " + ", ".join(
+            f"t={report['times'][k]:g}s({result['per_time'][k]:.2e})" for k in worst_times
+            if result["per_time"][k] > tolerance))
+
+
+if __name__ == '__main__':
+    allow_partial = '--allow-partial' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--allow-partial']
+    if len(args) < 2:
+        print("用法: python regression.py 基准文件 新结果 [容差] [--allow-partial]")
+        sys.exit(2)
+    tolerance = float(args[2]) if len(args) > 2 else default_tolerance
+    start_time = time.perf_counter()
+    golden = read_result(args[0])
+    candidate = read_result(args[1])
+    report = compare(golden, candidate, tolerance, allow_partial)
+    print_report(report, tolerance)
+    print(f"用时: {time.perf_counter() - start_time:.3f}秒")
+    sys.exit(0 if report["passed"] else 1)
@@ -0,0 +1,221 @@
+#灵敏度：在求解把手位置的同时，沿链条向后传递各把手极角对参数的导数(前向切线)，不需要为每个参数重复求解
+#龙头：由弧长方程 b*(g(theta)-g(theta_0)) + v*t = 0 隐函数求导，g(theta)为b=1时的螺线弧长
+#后续把手：对距离约束 |P_i - P_{i-1}|^2 = L^2 求导，
+#  e·P_i' dtheta_i = e·P_{i-1}' dtheta_{i-1} - |e|^2/b db，e = P_i - P_{i-1}
+#角速度 omega_i = omega_{i-1} (e·P_{i-1}')/(e·P_i') 同样逐节求导，得到把手速度对参数的导数
+#间隙是各板凳对距离的最小值(分段光滑)，它沿切线方向的导数用几何上的对称差分求出，链条本身不重新求解
+#调头过程(4/version2.py)中把手最大速度对调头空间半径的导数：调头路径的几何由半径经非线性关系决定，
+#  不做切线传递，按包络定理只在取到最大速度的时刻对该把手的速度做几何的对称差分
+#用法: python sensitivity.py
+import importlib.util
+import os
+import time
+import numpy as np
+
+import collision
+import dragon
+
+# 定义常量
+parameters = ("p", "v_head")  # 求导的参数
+r_turn = 4.5  # 调头空间半径(m)
+geometry_step = 1e-7  # 间隙方向导数的差分步长
+newton_steps = 20  # 牛顿法最多迭代次数
+pitch_tolerance = 1e-10  # 螺距的收敛精度(m)
+search_span = 2.0  # 在调头空间边界外多远的范围内找最小间隙(m)
+search_step = 0.01  # 找最小间隙时龙头半径的网格间距(m)
+collision_step = 0.1  # 找碰撞时刻时扫描的时间步长(s)
+turn_times = (-100.0, 100.0, 0.1)  # 找调头过程最大速度的时间范围和网格间距(s)
+radius_step = 1e-4  # 速度对调头空间半径求导的差分步长(m)
+
+# 螺线上极角theta处的位置、一阶和二阶导数，形状均为(..., 2)
+def spiral_derivatives(theta, b):
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    point = b * theta[..., None] * np.stack((cos_t, sin_t), axis=-1)
+    first = b * np.stack((cos_t - theta * sin_t, sin_t + theta * cos_t), axis=-1)
+    second = b * np.stack((-2 * sin_t - theta * cos_t, 2 * cos_t - theta * sin_t), axis=-1)
+    return point, first, second
+
+# 位置和位置导数对参数的切线：dP = P' dtheta + P/b db，dP' = P'' dtheta + P'/b db，形状为(T, 2, Q)
+def point_tangents(point, first, second, dtheta, b, db):
+    d_point = first[..., None] * dtheta[:, None] + point[..., None] / b * db
+    d_first = second[..., None] * dtheta[:, None] + first[..., None] / b * db
+    return d_point, d_first
+
+# 从龙头开始逐节求解把手并传递切线
+# theta, omega为龙头极角和角速度(T,)，dtheta, domega为它们对各参数的导数(T, Q)，db为b对各参数的导数(Q,)
+# 返回把手位置(T, N, 2)、速度矢量(T, N, 2)、速率(T, N)及它们对参数的导数(最后一维为Q)
+def propagate(theta, dtheta, omega, domega, b, db, handle_spacings=dragon.handle_spacings):
+    n = len(handle_spacings) + 1  # 最后一节板凳的后把手也算
+    num_times, num_params = dtheta.shape
+    positions = np.empty((num_times, n, 2))
+    d_positions = np.empty((num_times, n, 2, num_params))
+    velocities = np.empty((num_times, n, 2))
+    speeds = np.empty((num_times, n))
+    d_speeds = np.empty((num_times, n, num_params))
+    for i in range(n):
+        if i > 0:
+            prev_point, prev_first, prev_d_point, prev_d_first = point, first, d_point, d_first
+            theta = dragon.spiral_follower(theta, *prev_point.T, *prev_first.T, handle_spacings[i - 1], b)
+        point, first, second = spiral_derivatives(theta, b)
+        if i > 0:
+            e = point - prev_point
+            a_term = np.sum(e * prev_first, axis=-1)
+            b_term = np.sum(e * first, axis=-1)
+            dtheta = (a_term[:, None] * dtheta - np.sum(e * e, axis=-1)[:, None] / b * db) / b_term[:, None]
+        d_point, d_first = point_tangents(point, first, second, dtheta, b, db)
+        if i > 0:
+            de = d_point - prev_d_point
+            da = np.sum(de * prev_first[..., None] + e[..., None] * prev_d_first, axis=1)
+            dbt = np.sum(de * first[..., None] + e[..., None] * d_first, axis=1)
+            ratio = a_term / b_term
+            domega = domega * ratio[:, None] + omega[:, None] * (da * b_term[:, None] - a_term[:, None] * dbt) / b_term[:, None] ** 2
+            omega = omega * ratio
+        norm = np.hypot(first[:, 0], first[:, 1])
+        positions[:, i], d_positions[:, i] = point, d_point
+        velocities[:, i] = first * omega[:, None]
+        speeds[:, i] = norm * np.abs(omega)
+        d_speeds[:, i] = (np.sum(first[..., None] * d_first, axis=1) / norm[:, None] * np.abs(omega)[:, None]
+                          + (norm * np.sign(omega))[:, None] * domega)
+    return positions, d_positions, velocities, speeds, d_speeds
+
+# 问题2的碰撞时刻：按collision_step扫描间隙，在第一次变为不大于0的时间步内二分
+def collision_time(p=dragon.p, v_head=dragon.v_head, t_stop=440.0):
+    positions_fn = lambda times: dragon.solve_spiral_chain(times, p, v_head)[1]
+    times = np.arange(0, t_stop + collision_step / 2, collision_step)
+    touching = np.flatnonzero(dragon.chain_clearance(positions_fn(times)) <= collision.contact_tolerance)
+    if len(touching) == 0 or touching[0] == 0:
+        return None
+    k = touching[0]
+    return collision.locate_contact(positions_fn, times[k - 1], times[k])[0]
+
+# 问题2的盘入模型及其对螺距p和龙头速度v_head的导数
+def spiral_chain_sensitivity(times, p=dragon.p, v_head=dragon.v_head, theta_0=dragon.theta_0,
+                             handle_spacings=dragon.handle_spacings):
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    b = p / (2 * np.pi)
+    db = np.array([1 / (2 * np.pi), 0.0])
+    dv = np.array([0.0, 1.0])
+    theta = dragon.head_spiral_angle(times, p, v_head, theta_0)
+    slope = b * np.sqrt(1 + theta ** 2)  # 弧长对极角的导数
+    # b*(g(theta)-g(theta_0)) + v*t = 0
+    arc = dragon.spiral_arc_length(theta, 1.0) - dragon.spiral_arc_length(theta_0, 1.0)
+    dtheta = -(arc[:, None] * db + times[:, None] * dv) / slope[:, None]
+    omega = -v_head / slope
+    d_slope = np.sqrt(1 + theta ** 2)[:, None] * db + (b * theta / np.sqrt(1 + theta ** 2))[:, None] * dtheta
+    domega = -dv / slope[:, None] + (v_head / slope ** 2)[:, None] * d_slope
+    return propagate(theta, dtheta, omega, domega, b, db, handle_spacings)
+
+# 间隙沿位置切线方向的导数，d_positions为(T, N, 2)
+def clearance_derivative(positions, d_positions):
+    plus = dragon.chain_clearance(positions + geometry_step * d_positions)
+    minus = dragon.chain_clearance(positions - geometry_step * d_positions)
+    return (plus - minus) / (2 * geometry_step)
+
+# 碰撞时刻t_c对p和v_head的导数：间隙c(t_c, q) = 0，dt_c/dq = -(dc/dq)/(dc/dt)
+def collision_time_sensitivity(t_c, p=dragon.p, v_head=dragon.v_head):
+    positions, d_positions, velocities, _, _ = spiral_chain_sensitivity([t_c], p, v_head)
+    rate = clearance_derivative(positions, velocities)[0]
+    return np.array([-clearance_derivative(positions, d_positions[..., q])[0] / rate
+                     for q in range(len(parameters))])
+
+# 龙头位于半径radii处(theta = r/b)时的最小间隙及其对p的导数(保持龙头半径不变)
+def radius_clearance(p, radii):
+    radii = np.atleast_1d(np.asarray(radii, dtype=np.float64))
+    b = p / (2 * np.pi)
+    db = np.array([1 / (2 * np.pi)])
+    theta = radii / b
+    dtheta = (-radii / b ** 2 / (2 * np.pi))[:, None]
+    positions, d_positions, _, _, _ = propagate(theta, dtheta, np.zeros(len(radii)), np.zeros((len(radii), 1)), b, db)
+    return dragon.chain_clearance(positions), clearance_derivative(positions, d_positions[..., 0])
+
+# 龙头从外向内走到调头空间边界的过程中的最小间隙及其对p的导数
+# 先在龙头半径的网格上找最小值，再在附近加密；最小值处对p的导数就是整个最小间隙对p的导数(包络定理)
+def approach_clearance(p, r_turn=r_turn):
+    radii = r_turn + np.arange(0, search_span + search_step / 2, search_step)
+    clearance, _ = radius_clearance(p, radii)
+    k = np.argmin(clearance)
+    fine = np.linspace(max(radii[k] - search_step, r_turn), radii[k] + search_step, 201)
+    clearance, slope = radius_clearance(p, fine)
+    k = np.argmin(clearance)
+    return clearance[k], slope[k], fine[k]
+
+# 问题3：龙头走到调头空间边界之前刚好不碰撞的最小螺距，对最小间隙用牛顿法
+def minimum_pitch(p=dragon.p, r_turn=r_turn):
+    history = []
+    for _ in range(newton_steps):
+        clearance, slope, radius = approach_clearance(p, r_turn)
+        history.append((p, clearance, radius))
+        step = clearance / slope
+        p = p - step
+        if abs(step) < pitch_tolerance:
+            break
+    return p, history
+
+# 读取4/version2.py的调头模型(题目目录下的脚本不是包，按文件路径加载)
+def load_turn_model():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '4', 'version2.py')
+    spec = importlib.util.spec_from_file_location('turn_model', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# 调头空间半径为r_turn时调头过程中龙身把手的最大速度，返回(最大速度, 时刻, 把手下标)
+# 先在粗网格上找，再在取到最大值的时刻附近加密
+def turn_peak_speed(turn, r_turn):
+    geometry = turn.build_turn_geometry(r_turn=r_turn)
+    t_start, t_stop, step = turn_times
+    times = np.arange(t_start, t_stop + step / 2, step)
+    _, speeds, _ = turn.simulate_timeline(times, geometry)
+    k = np.argmax(speeds[:, 1:].max(axis=1))
+    fine = np.linspace(max(times[k] - step, t_start), min(times[k] + step, t_stop), 201)
+    _, speeds, _ = turn.simulate_timeline(fine, geometry)
+    k, i = np.unravel_index(np.argmax(speeds[:, 1:]), speeds[:, 1:].shape)
+    return speeds[k, i + 1], fine[k], i + 1
+
+# 调头过程中把手最大速度对调头空间半径的导数
+# 包络定理：最大值对半径的导数等于取到最大值的(时刻, 把手)处速度对半径的偏导数，只需在这一个时刻求两次
+def turn_speed_sensitivity(r_turn=r_turn, turn=None):
+    if turn is None:
+        turn = load_turn_model()
+    peak, t_peak, handle = turn_peak_speed(turn, r_turn)
+    speeds = [turn.simulate_timeline(np.array([t_peak]), turn.build_turn_geometry(r_turn=r_turn + sign * radius_step))[1][0, handle]
+              for sign in (1, -1)]
+    return peak, (speeds[0] - speeds[1]) / (2 * radius_step), t_peak, handle
+
+
+if __name__ == '__main__':
+    # 导数与有限差分比较
+    t = np.array([300.0])
+    positions, d_positions, _, speeds, d_speeds = spiral_chain_sensitivity(t)
+    for q, name in enumerate(parameters):
+        h = 1e-6
+        plus = dict(p=dragon.p, v_head=dragon.v_head)
+        minus = dict(plus)
+        plus[name] += h
+        minus[name] -= h
+        _, pos_plus, speed_plus = dragon.solve_spiral_chain(t, **plus)
+        _, pos_minus, speed_minus = dragon.solve_spiral_chain(t, **minus)
+        fd_positions = (pos_plus - pos_minus) / (2 * h)
+        fd_speeds = (speed_plus - speed_minus) / (2 * h)
+        print(f"t=300s 对{name}的导数与差分之差: 位置{np.abs(d_positions[..., q] - fd_positions).max():.2e}, "
+              f"速度{np.abs(d_speeds[..., q] - fd_speeds).max():.2e}")
+    peak = np.argmax(speeds[0, 1:]) + 1
+    print(f"t=300s 龙身把手最大速度{speeds[0, peak]:.6f}m/s(第{peak + 1}个把手)，"
+          f"对p的导数{d_speeds[0, peak, 0]:.6f}，对v_head的导数{d_speeds[0, peak, 1]:.6f}")
+
+    t_c = collision_time()
+    dt_c = collision_time_sensitivity(t_c)
+    print(f"碰撞时刻t={t_c:.6f}s: dt/dp={dt_c[0]:.4f} s/m, dt/dv_head={dt_c[1]:.4f} s^2/m")
+
+    turn = load_turn_model()
+    peak, slope, t_peak, handle = turn_speed_sensitivity(r_turn, turn)
+    h = 0.01
+    difference = (turn_peak_speed(turn, r_turn + h)[0] - turn_peak_speed(turn, r_turn - h)[0]) / (2 * h)
+    print(f"调头过程把手最大速度{peak:.6f}m/s(t={t_peak:.3f}s，第{handle + 1}个把手)，"
+          f"对调头空间半径的导数{slope:.6f}，整体差分{difference:.6f}")
+
+    start_time = time.perf_counter()
+    p_min, history = minimum_pitch()
+    print(f"最小螺距 p={p_min:.6f}m，牛顿法{len(history)}次求解，用时{time.perf_counter() - start_time:.2f}秒")
+    for p, clearance, radius in history:
+        print(f"  p={p:.8f}  最小间隙{clearance:+.3e}m(龙头半径{radius:.4f}m)")
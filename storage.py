@@ -0,0 +1,71 @@
+#轨迹的紧凑存储：求解器内部始终用float64，存盘和缓存时可以选float32或按固定量化步长存成int32
+#坐标在±20m左右、结果只保留6位小数，float32(约1e-6m)或int32(约1e-8m)都足够，内存和磁盘占用减半
+#保存时同时记录与float64结果相比的最大往返误差
+#用法: python storage.py [float32|int32|float64] [t_total] [dt]
+import os
+import sys
+import numpy as np
+
+import dragon
+
+# 定义常量
+precision_modes = ('float64', 'float32', 'int32')  # 可选的存储精度
+default_precision = 'float32'  # 默认存储精度
+int32_limit = 2 ** 31 - 1  # int32能表示的最大值
+
+# 把float64数组压成指定精度，返回存储用的数组和量化步长(只有int32用到)
+def pack(array, precision=default_precision):
+    if precision not in precision_modes:
+        raise ValueError(f"未知的存储精度: {precision}，可选{precision_modes}")
+    array = np.asarray(array, dtype=np.float64)
+    if precision == 'float64':
+        return array, 1.0
+    if precision == 'float32':
+        return array.astype(np.float32), 1.0
+    # int32：量化步长取能放下最大绝对值的最小步长
+    peak = np.max(np.abs(array), initial=0.0)
+    quantum = peak / int32_limit if peak > 0 else 1.0
+    return np.round(array / quantum).astype(np.int32), quantum
+
+# 还原成float64
+def unpack(data, quantum=1.0):
+    if data.dtype == np.int32:
+        return data.astype(np.float64) * quantum
+    return data.astype(np.float64)
+
+# 往返误差：压缩再还原后与原float64数组的最大绝对误差
+def round_trip_error(array, precision=default_precision):
+    data, quantum = pack(array, precision)
+    return float(np.max(np.abs(unpack(data, quantum) - array), initial=0.0))
+
+# 按指定精度保存轨迹，同时保存各数组的最大往返误差
+def save_trajectory(file_path, times, positions, velocities, precision=default_precision):
+    arrays = {"times": times, "positions": positions, "velocities": velocities}
+    stored = {"precision": np.array(precision)}
+    for name, array in arrays.items():
+        # 时刻本身不压缩，避免长时间序列上的时刻出现舍入
+        data, quantum = pack(array, 'float64' if name == 'times' else precision)
+        stored[name] = data
+        stored[f"{name}_quantum"] = np.array(quantum)
+        stored[f"{name}_error"] = np.array(np.max(np.abs(unpack(data, quantum) - array), initial=0.0))
+    np.savez(file_path, **stored)
+    return {name: float(stored[f"{name}_error"]) for name in arrays}
+
+# 读取轨迹并还原成float64，返回times, positions, velocities以及保存时记录的误差
+def load_trajectory(file_path):
+    with np.load(file_path) as data:
+        arrays = [unpack(data[name], float(data[f"{name}_quantum"])) for name in ('times', 'positions', 'velocities')]
+        errors = {name: float(data[f"{name}_error"]) for name in ('times', 'positions', 'velocities')}
+    return (*arrays, errors)
+
+
+if __name__ == '__main__':
+    precision = sys.argv[1] if len(sys.argv) > 1 else default_precision
+    t_total = float(sys.argv[2]) if len(sys.argv) > 2 else 300
+    dt = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    times, positions, velocities = dragon.simulate(t_total, dt)
+    file_path = f"trajectory_{precision}.npz"
+    errors = save_trajectory(file_path, times, positions, velocities, precision)
+    raw_size = times.nbytes + positions.nbytes + velocities.nbytes
+    print(f"存储精度{precision}: 文件{os.path.getsize(file_path) / 1e6:.2f}MB(float64为{raw_size / 1e6:.2f}MB)")
+    print(f"最大往返误差: 位置{errors['positions']:.2e}m, 速度{errors['velocities']:.2e}m/s")
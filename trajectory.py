@@ -0,0 +1,255 @@
+#压缩轨迹格式：只保存龙头的路径坐标曲线和稀疏关键帧上的各节板凳朝向角
+#任意时刻的位置和速度用三次样条插值按需重建，关键帧按误差上限加密
+#误差只能在检查过的时刻上度量：默认只查原始时刻；给出模型(按时刻求位置的函数)时还查相邻原始时刻的中点
+#max_error是这些检查点上的最大误差，不是任意时刻的误差上界；原始时刻之间发生的跳变等无法由样条表示，
+#此时中点误差会超过上限，tolerance_met为False
+#例如result1.xlsx(version3的径向摆放)中把手越过原点时朝向角跳变，生成的文件达不到上限(中点误差约9e-4m，
+#跳变区间内的时刻不能重建)；生成的关键帧文件不提交到仓库
+#用法: python trajectory.py result1.xlsx result1_keyframes.npz [--model]
+#  --model: 用dragon.solve_chain(version3的做法)计算中点处的真实位置来检查误差
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# 定义常量
+default_tolerance = 1e-6  # 默认位置误差上限(m)，结果只保留到6位小数
+initial_keyframes = 9  # 每段初始均匀关键帧数，之后按误差加密
+jump_threshold = 1.0  # 相邻时刻通道值变化超过该值(rad)视为跳变，在此处分段
+
+# 自然三次样条：求各节点处的二阶导数，y为(K, C)，对C个通道同时求解(追赶法)
+def spline_second_derivatives(x, y):
+    k = len(x)
+    m = np.zeros_like(y)
+    if k < 3:
+        return m
+    h = np.diff(x)
+    slope = np.diff(y, axis=0) / h[:, None]
+    rhs = 6 * (slope[1:] - slope[:-1])
+    diag = 2 * (h[:-1] + h[1:])
+    lower = h[:-1]
+    upper = h[1:]
+    # 消元
+    c = np.zeros(k - 2)
+    d = np.zeros_like(rhs)
+    c[0] = upper[0] / diag[0]
+    d[0] = rhs[0] / diag[0]
+    for j in range(1, k - 2):
+        denom = diag[j] - lower[j] * c[j - 1]
+        c[j] = upper[j] / denom
+        d[j] = (rhs[j] - lower[j] * d[j - 1]) / denom
+    # 回代
+    m[k - 2] = d[k - 3]
+    for j in range(k - 4, -1, -1):
+        m[j + 1] = d[j] - c[j] * m[j + 2]
+    return m
+
+# 计算样条在时刻t处的值和一阶导数，t为一维数组，返回两个(len(t), C)数组
+def evaluate_spline(x, y, m, t):
+    i = np.clip(np.searchsorted(x, t, side='right') - 1, 0, len(x) - 2)
+    h = (x[i + 1] - x[i])[:, None]
+    a = (x[i + 1] - t)[:, None]
+    b = (t - x[i])[:, None]
+    left = y[i] / h - m[i] * h / 6
+    right = y[i + 1] / h - m[i + 1] * h / 6
+    value = (m[i] * a ** 3 + m[i + 1] * b ** 3) / (6 * h) + left * a + right * b
+    slope = (m[i + 1] * b ** 2 - m[i] * a ** 2) / (2 * h) - left + right
+    return value, slope
+
+# 从密集的位置数组中提取各通道：龙头极径、龙头极角(展开后)、各节板凳朝向角(展开后)
+def extract_channels(positions):
+    head = positions[:, 0]
+    head_r = np.hypot(head[:, 0], head[:, 1])
+    head_theta = np.unwrap(np.arctan2(head[:, 1], head[:, 0]))
+    links = np.diff(positions, axis=1)
+    bench_angles = np.unwrap(np.arctan2(links[..., 1], links[..., 0]), axis=0)
+    lengths = np.median(np.hypot(links[..., 0], links[..., 1]), axis=0)
+    channels = np.column_stack((head_r, head_theta, bench_angles))
+    return channels, lengths
+
+# 由通道值(和导数)重建所有把手的位置和速度
+def channels_to_state(values, slopes, lengths):
+    head_r, head_theta = values[:, 0], values[:, 1]
+    cos_h, sin_h = np.cos(head_theta), np.sin(head_theta)
+    angles = values[:, 2:]
+    cos_a, sin_a = np.cos(angles), np.sin(angles)
+    positions = np.empty((len(values), len(lengths) + 1, 2))
+    positions[:, 0, 0] = head_r * cos_h
+    positions[:, 0, 1] = head_r * sin_h
+    positions[:, 1:, 0] = positions[:, :1, 0] + np.cumsum(lengths * cos_a, axis=1)
+    positions[:, 1:, 1] = positions[:, :1, 1] + np.cumsum(lengths * sin_a, axis=1)
+    if slopes is None:
+        return positions, None
+    # 龙头速度 = r'e_r + r theta' e_theta，后面各节再叠加 L phi' e_phi
+    dr, dtheta = slopes[:, 0], slopes[:, 1]
+    vx = np.empty((len(values), len(lengths) + 1))
+    vy = np.empty_like(vx)
+    vx[:, 0] = dr * cos_h - head_r * dtheta * sin_h
+    vy[:, 0] = dr * sin_h + head_r * dtheta * cos_h
+    dangles = slopes[:, 2:]
+    vx[:, 1:] = vx[:, :1] - np.cumsum(lengths * dangles * sin_a, axis=1)
+    vy[:, 1:] = vy[:, :1] + np.cumsum(lengths * dangles * cos_a, axis=1)
+    return positions, np.hypot(vx, vy)
+
+# 在检查时刻check_times上计算重建误差，reference为这些时刻的真实位置，返回每个时刻所有把手的最大位置误差
+def reconstruction_error(check_times, reference, key_times, key_channels, lengths):
+    m = spline_second_derivatives(key_times, key_channels)
+    values, _ = evaluate_spline(key_times, key_channels, m, check_times)
+    rebuilt, _ = channels_to_state(values, None, lengths)
+    diff = rebuilt - reference
+    return np.hypot(diff[..., 0], diff[..., 1]).max(axis=1)
+
+# 按跳变把时间轴分段：version3的径向摆放中把手越过原点时朝向角会突变pi，样条不能跨过这种跳变
+def split_segments(channels):
+    jumps = np.flatnonzero(np.abs(np.diff(channels, axis=0)).max(axis=1) > jump_threshold)
+    starts = np.concatenate(([0], jumps + 1))
+    stops = np.concatenate((jumps + 1, [len(channels)]))
+    return list(zip(starts, stops))
+
+# 在一段内选关键帧：从均匀的少量关键帧开始，在误差超限的区间中点插入新关键帧，直到满足误差上限
+# 检查点是各原始时刻，给出mid_positions(相邻原始时刻中点处的真实位置)时还检查这些中点
+# 超限的区间已经只剩相邻两个原始时刻时无法再加密，返回的误差会大于上限
+def select_keyframes(times, positions, channels, lengths, tolerance, mid_positions=None):
+    key_index = np.unique(np.linspace(0, len(times) - 1, initial_keyframes).astype(int))
+    if len(key_index) < 2:
+        return key_index, 0.0
+    check_times, reference = times, positions
+    # 检查点所在的原始时间区间的左端下标，中点j在原始时刻j和j+1之间
+    check_index = np.arange(len(times))
+    if mid_positions is not None:
+        check_times = np.concatenate((times, (times[:-1] + times[1:]) / 2))
+        reference = np.concatenate((positions, mid_positions))
+        check_index = np.concatenate((check_index, np.arange(len(times) - 1)))
+    while True:
+        error = reconstruction_error(check_times, reference, times[key_index], channels[key_index], lengths)
+        # 找出含有超限检查点的区间
+        interval = np.searchsorted(key_index, check_index[error > tolerance], side='right') - 1
+        interval = np.unique(np.clip(interval, 0, len(key_index) - 2))
+        midpoints = (key_index[interval] + key_index[interval + 1]) // 2
+        midpoints = midpoints[midpoints > key_index[interval]]
+        if len(midpoints) == 0:
+            break
+        key_index = np.union1d(key_index, midpoints)
+    return key_index, error.max()
+
+# 压缩轨迹，各段分别选关键帧，segment_offsets记录每段关键帧在数组中的起止位置
+# model为按时刻数组求位置(len(t), num_sections, 2)的函数，给出时还在相邻原始时刻的中点检查误差
+def compress_trajectory(times, positions, tolerance=default_tolerance, model=None):
+    times = np.asarray(times, dtype=np.float64)
+    channels, lengths = extract_channels(positions)
+    mid_positions = None if model is None else model((times[:-1] + times[1:]) / 2)
+    key_index = []
+    offsets = [0]
+    max_error = 0.0
+    for start, stop in split_segments(channels):
+        index, error = select_keyframes(times[start:stop], positions[start:stop], channels[start:stop], lengths,
+                                        tolerance, None if model is None else mid_positions[start:stop - 1])
+        key_index.append(index + start)
+        offsets.append(offsets[-1] + len(index))
+        max_error = max(max_error, error)
+    key_index = np.concatenate(key_index)
+    return {
+        "key_times": times[key_index],
+        "key_channels": channels[key_index],
+        "segment_offsets": np.array(offsets),
+        "lengths": lengths,
+        "tolerance": float(tolerance),
+        "max_error": float(max_error),
+        "checked": "samples+midpoints" if model is not None else "samples",
+        "tolerance_met": bool(max_error <= tolerance),
+    }
+
+# 直接以全部样本为关键帧，不做误差检查；用于自适应步长等已经按误差选好时刻的非均匀样本
+def keyframes_from_samples(times, positions):
+    times = np.asarray(times, dtype=np.float64)
+    channels, lengths = extract_channels(positions)
+    offsets = [0] + [stop for _, stop in split_segments(channels)]
+    keyframes = {
+        "key_times": times,
+        "key_channels": channels,
+        "segment_offsets": np.array(offsets),
+        "lengths": lengths,
+        "tolerance": np.inf,
+        "max_error": np.nan,
+        "checked": "none",
+        "tolerance_met": False,
+    }
+    keyframes["key_moments"] = keyframe_moments(keyframes)
+    return keyframes
+
+# 保存和读取压缩轨迹
+def save_keyframes(keyframes, file_path):
+    np.savez_compressed(file_path, **keyframes)
+
+def load_keyframes(file_path):
+    with np.load(file_path) as data:
+        keyframes = {key: data[key] for key in data.files}
+    keyframes["tolerance"] = float(keyframes["tolerance"])
+    keyframes["max_error"] = float(keyframes["max_error"])
+    # 早期保存的文件没有这两项，误差只在原始时刻检查过
+    keyframes["checked"] = str(keyframes.get("checked", "samples"))
+    keyframes["tolerance_met"] = bool(keyframes.get("tolerance_met", keyframes["max_error"] <= keyframes["tolerance"]))
+    # 二阶导数只在读取时算一次，之后的查询直接使用
+    keyframes["key_moments"] = keyframe_moments(keyframes)
+    return keyframes
+
+# 各段分别求样条的二阶导数
+def keyframe_moments(keyframes):
+    x, y = keyframes["key_times"], keyframes["key_channels"]
+    offsets = keyframes["segment_offsets"]
+    return np.concatenate([spline_second_derivatives(x[a:b], y[a:b]) for a, b in zip(offsets[:-1], offsets[1:])])
+
+# 重建任意时刻的状态，返回(len(t), num_sections, 2)的位置和(len(t), num_sections)的速度
+# 落在两段之间跳变区间内(前一段最后一个关键帧与后一段第一个关键帧之间)的时刻没有可重建的状态，抛出ValueError
+def reconstruct(keyframes, t):
+    t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+    x, y = keyframes["key_times"], keyframes["key_channels"]
+    if np.any((t < x[0]) | (t > x[-1])):
+        raise ValueError(f"查询时刻超出轨迹范围[{x[0]}, {x[-1]}]")
+    m = keyframes.get("key_moments")
+    if m is None:
+        m = keyframe_moments(keyframes)
+    offsets = keyframes["segment_offsets"]
+    segment = np.searchsorted(x[offsets[:-1]], t, side='right') - 1
+    in_gap = t > x[offsets[1:] - 1][segment]
+    if np.any(in_gap):
+        gap = segment[np.argmax(in_gap)]
+        raise ValueError(f"查询时刻{t[in_gap][0]}落在跳变区间({x[offsets[gap + 1] - 1]}, {x[offsets[gap + 1]]})内，"
+                         f"该处没有可重建的状态")
+    values = np.empty((len(t), y.shape[1]))
+    slopes = np.zeros((len(t), y.shape[1]))
+    for j in np.unique(segment):
+        a, b = offsets[j], offsets[j + 1]
+        mask = segment == j
+        if b - a == 1:
+            values[mask] = y[a]
+            continue
+        values[mask], slopes[mask] = evaluate_spline(x[a:b], y[a:b], m[a:b], t[mask])
+    return channels_to_state(values, slopes, keyframes["lengths"])
+
+# 从问题1格式的Excel结果(time, section, x_position, y_position)读取密集轨迹
+def read_excel_trajectory(excel_file_path):
+    table = pd.read_excel(excel_file_path)
+    times = np.unique(table["time"].to_numpy(dtype=np.float64))
+    num_sections = int(table["section"].max())
+    table = table.sort_values(["time", "section"])
+    positions = table[["x_position", "y_position"]].to_numpy().reshape(len(times), num_sections, 2)
+    return times, positions
+
+
+if __name__ == '__main__':
+    excel_file_path = sys.argv[1] if len(sys.argv) > 1 else 'result1.xlsx'
+    output_path = sys.argv[2] if len(sys.argv) > 2 else 'result1_keyframes.npz'
+    model = None
+    if '--model' in sys.argv[3:]:
+        import dragon
+        model = dragon.solve_chain
+    times, positions = read_excel_trajectory(excel_file_path)
+    start_time = time.perf_counter()
+    keyframes = compress_trajectory(times, positions, model=model)
+    print(f"压缩用时: {time.perf_counter() - start_time:.3f}秒")
+    save_keyframes(keyframes, output_path)
+    checked = "原始时刻和相邻时刻中点" if keyframes['checked'] == "samples+midpoints" else "原始时刻(时刻之间未检查)"
+    print(f"{len(times)}个时刻压缩为{len(keyframes['key_times'])}个关键帧，"
+          f"{checked}上的最大位置误差{keyframes['max_error']:.2e}m"
+          f"{'' if keyframes['tolerance_met'] else '，超过上限'}，已保存到: {output_path}")